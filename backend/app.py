@@ -1,9 +1,178 @@
-from fastapi import FastAPI, File
-from fastapi.responses import JSONResponse
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from typing import Annotated
-from module.ui_rules import ui_rules
+from module.batch import as_completed_bounded, is_zip, zip_members
+from module.cache import ResultCache, build_color_options, result_key
+from module.http import UploadLimitMiddleware
+from module.jobs import JobQueueFullError, JobScheduler, JobStore
+from module.metrics import server_timing
+from module.palettes import (
+    EXPORT_FORMATS,
+    PaletteStore,
+    export_lines,
+    palette_vector,
+    parse_hex,
+    rgb_to_lab,
+)
+from module.metrics import service as metrics
+from module.worker import AnalysisPool, PoolSaturatedError
+from module.worker.tasks import analyze_60_30_10, init_worker, warm_up_image
+from settings import settings
 
-app = FastAPI()
+# numpy, Pillow, OpenCV and scikit-learn are imported on first use (or during warm-up)
+# so that starting the server and spawning workers stays fast.
+
+cnn_predictor = None
+job_store = None
+job_scheduler = None
+palette_store = None
+# KD-trees over the stored palettes, built on the first search (see _get_palette_index).
+palette_index = None
+palette_index_lock = asyncio.Lock()
+cnn_predictor_lock = asyncio.Lock()
+# Analyses being added to the palette store after their response was sent.
+palette_tasks = set()
+logger = logging.getLogger(__name__)
+pool = AnalysisPool(
+    max_workers=settings.analysis_workers,
+    max_pending=settings.analysis_queue_size,
+    initializer=init_worker,
+    initargs=(settings.analysis_threads, settings.warmup),
+)
+result_cache = ResultCache(
+    max_entries=settings.result_cache_size,
+    directory=settings.result_cache_dir,
+    max_disk_bytes=settings.result_cache_dir_bytes,
+)
+# Per-tile color counts of recent analyses, used to analyse revisions incrementally.
+analysis_states = ResultCache(max_entries=settings.analysis_state_cache_size)
+
+metrics.registry.counter(
+    "result_cache_hits_total", "Result cache hits.", lambda: result_cache.hits
+)
+metrics.registry.counter(
+    "result_cache_misses_total", "Result cache misses.", lambda: result_cache.misses
+)
+metrics.registry.gauge(
+    "result_cache_hit_ratio",
+    "Share of lookups served from the result cache.",
+    lambda: result_cache.stats()["hit_rate"],
+)
+metrics.registry.gauge(
+    "analysis_in_flight", "Analyses running or waiting for a worker.", lambda: pool.in_flight
+)
+metrics.registry.gauge(
+    "jobs_queued",
+    "Background jobs waiting to run.",
+    lambda: job_scheduler.queued if job_scheduler else 0,
+)
+metrics.registry.gauge(
+    "jobs_running",
+    "Background jobs running.",
+    lambda: job_scheduler.running if job_scheduler else 0,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_store, job_scheduler, palette_store
+    pool.start()
+    if settings.warmup:
+        _check_options("kmeans", None)
+        _validate_image(warm_up_image())
+        await pool.warm_up()
+    job_store = JobStore(settings.job_db)
+    job_scheduler = JobScheduler(
+        job_store,
+        _run_job,
+        max_running=settings.job_concurrency,
+        max_running_per_client=settings.job_client_concurrency,
+        max_queued_per_client=settings.job_client_queue_size,
+        retry_after=settings.retry_after,
+        heartbeat_interval=settings.job_heartbeat_interval,
+        stale_after=settings.job_stale_after,
+        retention=settings.job_retention,
+        purge_interval=settings.job_purge_interval,
+    )
+    job_scheduler.start()
+    palette_store = PaletteStore(settings.palette_db)
+    yield
+    await job_scheduler.stop()
+    job_store.close()
+    await asyncio.gather(*palette_tasks, return_exceptions=True)
+    palette_store.close()
+    pool.shutdown()
+    if cnn_predictor is not None:
+        cnn_predictor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+# Bodies are capped before FastAPI parses and spools the form; the margin covers the
+# multipart headers around the files
+_FORM_OVERHEAD = 1024 * 1024
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_body_bytes=settings.max_upload_bytes + _FORM_OVERHEAD,
+    path_limits={"/batch": settings.batch_max_upload_bytes + _FORM_OVERHEAD},
+)
+
+
+def _saturated_response():
+    metrics.rejected_total.inc()
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry later."},
+        headers={"Retry-After": str(settings.retry_after)},
+    )
+
+
+async def _read_upload(upload: UploadFile):
+    """
+    Read an uploaded file without exceeding the upload size limit. The request body as
+    a whole was already capped by UploadLimitMiddleware.
+    :return: The file bytes.
+    """
+    limit = settings.max_upload_bytes
+    chunks = []
+    size = 0
+    while chunk := await upload.read(1024 * 1024):
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Upload is too large.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _check_options(engine: str, sample: str | None):
+    from module.ui_rules.engines import ENGINES
+    from module.ui_rules.sampling import SAMPLING_STRATEGIES
+
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown palette engine: {engine}")
+    if sample is not None and sample not in SAMPLING_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown sampling strategy: {sample}")
+
+
+def _validate_image(image_byte: bytes, **limits):
+    """
+    Read the image header and reject uploads the backend does not accept.
+    :param limits: Limits passed to ImageHandler (max_pixels, max_frames).
+    :return: The ImageInfo of the upload.
+    """
+    from module.validation import ImageHandler, ImageValidationError
+
+    try:
+        return ImageHandler(image_byte, **limits).validate()
+    except ImageValidationError as error:
+        raise HTTPException(status_code=error.status_code, detail=str(error))
 
 
 @app.get("/")
@@ -11,8 +180,646 @@ def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/metrics")
+def read_metrics():
+    return PlainTextResponse(metrics.registry.render())
+
+
+@app.get("/engines")
+def list_engines():
+    from module.ui_rules.engines import ENGINES
+
+    return {name: engine.cost.to_dict() for name, engine in ENGINES.items()}
+
+
+def _load_cnn_predictor():
+    # torch is only needed for this endpoint, so import it on first use
+    from machine_learning.inference import BatchedPredictor
+
+    predictor = BatchedPredictor(
+        max_batch_size=settings.cnn_max_batch_size,
+        max_latency_ms=settings.cnn_max_latency_ms,
+        num_threads=settings.cnn_threads,
+        runtime=settings.cnn_runtime,
+    )
+    predictor.start()
+    return predictor
+
+
+async def _get_cnn_predictor():
+    global cnn_predictor
+    async with cnn_predictor_lock:
+        if cnn_predictor is None:
+            # Importing torch and loading the model take seconds, so keep them off the loop
+            cnn_predictor = await asyncio.to_thread(_load_cnn_predictor)
+    return cnn_predictor
+
+
+@app.post("/cnn")
+async def predict_cnn(request: Request, image: UploadFile):
+    image = await _read_upload(image)
+    _validate_image(image, max_pixels=settings.max_image_pixels)
+
+    try:
+        predictor = await _get_cnn_predictor()
+        primary, secondary, accent = await predictor.predict_async(image)
+    except (ImportError, FileNotFoundError):
+        raise HTTPException(status_code=503, detail="The CNN model is not available.")
+    return {"primary": primary, "secondary": secondary, "accent": accent}
+
+
+def _color_options(info, engine: str, sample: str | None, sample_size: int):
+    """
+    Build the ColorModule options for an upload with the decode limits of the settings.
+    :param info: ImageInfo of the upload.
+    :return: A dictionary of options for analyze_60_30_10.
+    :raises HTTPException: 413 if decoding the image would exceed the memory budget.
+    """
+    from module.validation import ImageValidationError
+
+    try:
+        return build_color_options(
+            info,
+            engine,
+            sample,
+            sample_size,
+            decode_max_pixels=settings.decode_max_pixels,
+            memory_budget=settings.analysis_memory_budget,
+        )
+    except ImageValidationError as error:
+        raise HTTPException(status_code=error.status_code, detail=str(error))
+
+
+async def _analyze(
+    image_byte: bytes,
+    acceptable_range: float,
+    color_options: dict,
+    incremental: bool = False,
+    previous: str | None = None,
+):
+    """
+    Run the 60-30-10 analysis through the result cache and the worker pool.
+    :param incremental: Keep the per-tile state of the analysis so that a later revision
+        can be analysed incrementally.
+    :param previous: Key of an earlier analysis of a previous revision of the image.
+    :return: A tuple (key, result, report); key identifies the analysis and report is None
+        when the result came from the cache.
+    :raises PoolSaturatedError: If every worker is busy and the wait queue is full.
+    """
+    key = result_key(image_byte, acceptable_range, color_options)
+    result = result_cache.get(key)
+    if result is not None:
+        return key, result, None
+    result, report = await _run_analysis(
+        key, image_byte, acceptable_range, color_options, incremental, previous
+    )
+    return key, result, report
+
+
+async def _run_analysis(
+    key: str,
+    image_byte: bytes,
+    acceptable_range: float,
+    color_options: dict,
+    incremental: bool = False,
+    previous: str | None = None,
+    init=None,
+):
+    """
+    Run the 60-30-10 analysis in the worker pool and cache the result under key.
+    :param init: Palette to start clustering from, e.g. the colors of a coarser pass.
+    :return: A tuple (result, report).
+    :raises PoolSaturatedError: If every worker is busy and the wait queue is full.
+    """
+    # Incremental analysis counts colors per tile, which sampling does not do.
+    incremental = incremental and analysis_states.max_entries > 0 and "sample" not in color_options
+    if incremental:
+        color_options = {
+            **color_options,
+            "incremental": True,
+            "previous": analysis_states.get(previous) if previous else None,
+        }
+    submitted_at = time.time()
+    result, report = await pool.run(
+        analyze_60_30_10,
+        image_byte,
+        acceptable_range,
+        timing=settings.stage_timing,
+        # Tiling does not change the result, so it is not part of the cache key.
+        tile_workers=settings.tile_workers,
+        tile_min_pixels=settings.tile_min_pixels,
+        # Like the previous palette of an incremental analysis, a warm start only moves
+        # where clustering begins, so it is not part of the cache key either.
+        init=init,
+        **color_options,
+    )
+    result_cache.put(key, result)
+    # Storing the palette may rebuild the search index, which takes seconds on a large
+    # store, so it runs in the background and is not awaited by the request
+    task = asyncio.create_task(asyncio.to_thread(_store_palette, key, image_byte, result))
+    palette_tasks.add(task)
+    task.add_done_callback(palette_tasks.discard)
+    if report["state"] is not None:
+        analysis_states.put(key, report["state"])
+
+    report["queue_wait"] = max(0.0, report["started_at"] - submitted_at)
+    metrics.queue_wait_seconds.observe(report["queue_wait"])
+    metrics.image_megapixels.observe(report["megapixels"])
+    for stage in report["stages"]:
+        metrics.stage_seconds.observe(stage["seconds"], stage=stage["name"])
+    return result, report
+
+
+def _store_palette(key: str, image_byte: bytes, result: dict):
+    # Best effort: the analysis already succeeded, so a failure only loses its palette
+    try:
+        # Searches read new palettes from the store (see _get_palette_index)
+        palette_store.add(key, hashlib.sha256(image_byte).hexdigest(), result)
+    except Exception:
+        logger.exception("Could not store the palette of analysis %s", key)
+
+
+async def _run_job(image_byte: bytes, params: dict):
+    _, result, _ = await _analyze(
+        image_byte, params["acceptable_range"], params["color_options"]
+    )
+    return result
+
+
+def _client_id(request: Request):
+    # Clients behind a shared proxy can identify themselves; otherwise use their address.
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
 @app.post("/603010")
-async def upload_image(image: Annotated[bytes, File()]):
-    ui = ui_rules.UIRulesModule(image)
-    result = ui.check_60_30_10_rule()
-    return JSONResponse(content=result)
+async def upload_image(
+    request: Request,
+    image: UploadFile,
+    acceptable_range: float = 5,
+    sample: str | None = None,
+    sample_size: Annotated[int, Query(gt=0)] = 100_000,
+    engine: str = "kmeans",
+    previous: str | None = None,
+    revisable: bool = False,
+):
+    _check_options(engine, sample)
+
+    started = time.perf_counter()
+    image = await _read_upload(image)
+    info = _validate_image(
+        image,
+        max_pixels=settings.max_image_pixels,
+        max_frames=settings.max_image_frames,
+    )
+
+    color_options = _color_options(info, engine, sample, sample_size)
+    try:
+        # Keeping the per-tile state costs time and memory, so only analyses that will
+        # be revised, or are revisions themselves, keep it
+        key, result, report = await _analyze(
+            image,
+            acceptable_range,
+            color_options,
+            incremental=revisable or previous is not None,
+            previous=previous,
+        )
+    except PoolSaturatedError:
+        return _saturated_response()
+
+    # Clients pass the analysis id back as ?previous= when they upload the next revision.
+    elapsed = time.perf_counter() - started
+    if report is None:
+        metrics.request_seconds.observe(elapsed, cache="hit")
+        return JSONResponse(
+            content=result,
+            headers={
+                "X-Cache": "HIT",
+                "X-Analysis-Id": key,
+                "Server-Timing": server_timing([], total=elapsed),
+            },
+        )
+    metrics.request_seconds.observe(elapsed, cache="miss")
+    timing = server_timing(report["stages"], queue=report["queue_wait"], total=elapsed)
+    return JSONResponse(
+        content=result,
+        headers={"X-Cache": "MISS", "X-Analysis-Id": key, "Server-Timing": timing},
+    )
+
+
+def _sse_event(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _pass_event(key: str, index: int, final: bool, result: dict, megapixels, started: float):
+    data = {
+        "pass": index,
+        "final": final,
+        "megapixels": megapixels,
+        "seconds": time.perf_counter() - started,
+        "result": result,
+    }
+    if final:
+        # Clients pass the id back as /603010?previous= for the next revision.
+        data["id"] = key
+    return _sse_event("result", data)
+
+
+def _palette(result: dict):
+    return [result[f"{role}_color"]["color"] for role in ("primary", "secondary", "accent")]
+
+
+def _progressive_passes(info, color_options: dict):
+    """
+    Pixel counts of the coarse passes to run before the full analysis of an upload.
+    :param info: ImageInfo of the upload.
+    :return: Increasing pixel counts, each below the resolution of the full analysis.
+    """
+    full = min(info.pixels, color_options.get("max_pixels") or info.pixels)
+    return [pixels for pixels in sorted(set(settings.progressive_pixels)) if pixels < full]
+
+
+async def _run_pass(
+    key: str,
+    image_byte: bytes,
+    acceptable_range: float,
+    color_options,
+    pixels,
+    init,
+    incremental: bool = False,
+):
+    """
+    Run one pass of a progressive analysis; pixels None is the full, cached analysis.
+    :param incremental: Keep the per-tile state of the full analysis for a later revision.
+    :return: A tuple (result, megapixels).
+    :raises PoolSaturatedError: If every worker is busy and the wait queue is full.
+    """
+    if pixels is None:
+        result, report = await _run_analysis(
+            key, image_byte, acceptable_range, color_options, incremental, init=init
+        )
+    else:
+        result, report = await pool.run(
+            analyze_60_30_10,
+            image_byte,
+            acceptable_range,
+            init=init,
+            **{**color_options, "max_pixels": pixels},
+        )
+    return result, report["megapixels"]
+
+
+async def _progressive_events(
+    key: str,
+    image_byte: bytes,
+    acceptable_range: float,
+    color_options: dict,
+    passes: list,
+    first: tuple,
+    started: float,
+    revisable: bool = False,
+):
+    """
+    Yield a Server-Sent Event per pass: the first one, already computed, then every finer
+    pass warm-started from the colors of the previous one. The last pass is the full analysis.
+    :param passes: Pixel counts of the passes, None for the full analysis.
+    :param first: (result, megapixels) of the first pass.
+    """
+    result, megapixels = first
+    yield _pass_event(key, 0, len(passes) == 1, result, megapixels, started)
+    try:
+        for index, pixels in enumerate(passes[1:], start=1):
+            while True:
+                try:
+                    result, megapixels = await _run_pass(
+                        key,
+                        image_byte,
+                        acceptable_range,
+                        color_options,
+                        pixels,
+                        _palette(result),
+                        revisable,
+                    )
+                    break
+                except PoolSaturatedError:
+                    # The client already has a result; wait for a worker to refine it.
+                    await asyncio.sleep(settings.retry_after)
+            yield _pass_event(key, index, pixels is None, result, megapixels, started)
+    except Exception as error:
+        yield _sse_event("error", {"status": 500, "detail": str(error) or type(error).__name__})
+        return
+    metrics.request_seconds.observe(time.perf_counter() - started, cache="miss")
+
+
+@app.post("/603010/stream")
+async def stream_image(
+    request: Request,
+    image: UploadFile,
+    acceptable_range: float = 5,
+    sample: str | None = None,
+    sample_size: Annotated[int, Query(gt=0)] = 100_000,
+    engine: str = "kmeans",
+    revisable: bool = False,
+):
+    _check_options(engine, sample)
+
+    started = time.perf_counter()
+    image = await _read_upload(image)
+    info = _validate_image(
+        image,
+        max_pixels=settings.max_image_pixels,
+        max_frames=settings.max_image_frames,
+    )
+    color_options = _color_options(info, engine, sample, sample_size)
+    key = result_key(image, acceptable_range, color_options)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Analysis-Id": key}
+
+    result = result_cache.get(key)
+    if result is not None:
+        metrics.request_seconds.observe(time.perf_counter() - started, cache="hit")
+        return StreamingResponse(
+            iter([_pass_event(key, 0, True, result, None, started)]),
+            media_type="text/event-stream",
+            headers={**headers, "X-Cache": "HIT"},
+        )
+
+    # The first pass runs before the response starts, so a busy server still answers 503.
+    passes = _progressive_passes(info, color_options) + [None]
+    try:
+        first = await _run_pass(
+            key, image, acceptable_range, color_options, passes[0], None, revisable
+        )
+    except PoolSaturatedError:
+        return _saturated_response()
+    events = _progressive_events(
+        key, image, acceptable_range, color_options, passes, first, started, revisable
+    )
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers={**headers, "X-Cache": "MISS"}
+    )
+
+
+async def _read_batch_upload(upload: UploadFile):
+    if upload.size is not None and upload.size > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Upload is too large.")
+    return await upload.read()
+
+
+async def _read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+    if info.file_size > settings.max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Upload is too large.")
+    return await asyncio.to_thread(archive.read, info)
+
+
+async def _raise_batch_error(status_code: int, detail: str):
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+async def _batch_items(uploads: list[UploadFile]):
+    """
+    Yield (index, name, read) for every image of a batch, expanding zip archives.
+    read is a coroutine function returning the image bytes, so images are only loaded
+    when a worker is free to analyse them.
+    """
+    index = 0
+
+    def item(name, read):
+        nonlocal index
+        index += 1
+        return index - 1, name, read
+
+    for upload in uploads:
+        if not is_zip(upload.file):
+            names = [(upload.filename, functools.partial(_read_batch_upload, upload))]
+        else:
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                detail = "Upload is not a valid zip archive."
+                yield item(upload.filename, functools.partial(_raise_batch_error, 400, detail))
+                continue
+            names = [
+                (info.filename, functools.partial(_read_zip_member, archive, info))
+                for info in zip_members(archive)
+            ]
+        for name, read in names:
+            if index >= settings.batch_max_items:
+                detail = f"Batch has more than {settings.batch_max_items} images."
+                yield item(name, functools.partial(_raise_batch_error, 413, detail))
+                return
+            yield item(name, read)
+
+
+async def _analyze_batch_item(item, acceptable_range: float, **options):
+    """
+    Analyse one image of a batch; errors are reported in the line instead of raised.
+    :param item: (index, name, read) from _batch_items.
+    :param options: engine, sample and sample_size for _color_options.
+    :return: One NDJSON line.
+    """
+    index, name, read = item
+    line = {"index": index, "name": name}
+    try:
+        image = await read()
+        info = _validate_image(
+            image,
+            max_pixels=settings.max_image_pixels,
+            max_frames=settings.max_image_frames,
+        )
+        color_options = _color_options(info, **options)
+        while True:
+            try:
+                _, result, _ = await _analyze(image, acceptable_range, color_options)
+                break
+            except PoolSaturatedError:
+                # Wait for a free worker rather than failing part of the batch.
+                await asyncio.sleep(settings.retry_after)
+        line.update(status=200, result=result)
+    except HTTPException as error:
+        line.update(status=error.status_code, error=error.detail)
+    except Exception as error:
+        line.update(status=500, error=str(error) or type(error).__name__)
+    return json.dumps(line) + "\n"
+
+
+@app.post("/batch")
+async def analyze_batch(
+    images: list[UploadFile],
+    acceptable_range: float = 5,
+    sample: str | None = None,
+    sample_size: Annotated[int, Query(gt=0)] = 100_000,
+    engine: str = "kmeans",
+):
+    _check_options(engine, sample)
+    if sum(upload.size or 0 for upload in images) > settings.batch_max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Batch is too large.")
+
+    worker = functools.partial(
+        _analyze_batch_item,
+        acceptable_range=acceptable_range,
+        engine=engine,
+        sample=sample,
+        sample_size=sample_size,
+    )
+    lines = as_completed_bounded(_batch_items(images), worker, settings.batch_concurrency)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    image: UploadFile,
+    acceptable_range: float = 5,
+    sample: str | None = None,
+    sample_size: Annotated[int, Query(gt=0)] = 100_000,
+    engine: str = "kmeans",
+    priority: Annotated[int, Query(ge=-10, le=10)] = 0,
+):
+    _check_options(engine, sample)
+    client = _client_id(request)
+    try:
+        job_scheduler.check_capacity(client)
+    except JobQueueFullError as error:
+        raise HTTPException(
+            status_code=429,
+            detail=str(error),
+            headers={"Retry-After": str(settings.retry_after)},
+        )
+
+    image = await _read_upload(image)
+    info = _validate_image(
+        image,
+        max_pixels=settings.max_image_pixels,
+        max_frames=settings.max_image_frames,
+    )
+    params = {
+        "acceptable_range": acceptable_range,
+        "color_options": _color_options(info, engine, sample, sample_size),
+    }
+    job_id = await asyncio.to_thread(job_store.create, image, params, client, priority)
+    job_scheduler.submit(job_id, client, priority)
+    return JSONResponse(
+        status_code=202,
+        content={"id": job_id, "status": "queued"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def read_job(job_id: str, wait: Annotated[float, Query(ge=0)] = 0):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    if wait > 0 and job["status"] in ("queued", "running"):
+        # Long poll: answer as soon as the job finishes, or after the wait expires.
+        await job_scheduler.wait(job_id, min(wait, settings.job_max_wait))
+        job = await asyncio.to_thread(job_store.get, job_id)
+    return job
+
+
+async def _get_palette_index():
+    """
+    :return: The PaletteIndex, holding every palette stored so far by any worker.
+    """
+    global palette_index
+    async with palette_index_lock:
+        if palette_index is None:
+            # numpy and scikit-learn are only needed for searches, so import them on first use
+            from module.palettes import PaletteIndex
+
+            index = PaletteIndex(palette_store)
+            await asyncio.to_thread(index.load)
+            palette_index = index
+    # Other server processes share the store, so index what they stored since the last
+    # search; only rows after the highest indexed id are read
+    await asyncio.to_thread(palette_index.refresh)
+    return palette_index
+
+
+def _parse_colors(value: str, count: int):
+    try:
+        colors = [parse_hex(color.strip()) for color in value.split(",")]
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if len(colors) != count:
+        raise HTTPException(status_code=400, detail=f"Expected {count} #rrggbb colors.")
+    return colors
+
+
+@app.get("/palettes/similar")
+async def similar_palettes(
+    id: str | None = None,
+    colors: str | None = None,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 10,
+):
+    # Search around a stored analysis (?id=) or primary, secondary and accent colors
+    if (id is None) == (colors is None):
+        raise HTTPException(status_code=400, detail="Pass either id or colors.")
+    if id is not None:
+        record = await asyncio.to_thread(palette_store.get, id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Unknown analysis.")
+        vector = palette_vector(record["result"])
+    else:
+        vector = [value for color in _parse_colors(colors, 3) for value in rgb_to_lab(color)]
+
+    index = await _get_palette_index()
+    # Ask for one more so the analysis itself can be left out
+    matches = index.similar(vector, limit + 1 if id is not None else limit)
+    records = await asyncio.to_thread(palette_store.get_many, [row_id for row_id, _ in matches])
+    results = [
+        {**record, "distance": distance}
+        for record, (_, distance) in zip(records, matches)
+        if record["id"] != id
+    ]
+    return {"results": results[:limit]}
+
+
+@app.get("/palettes/primary")
+async def palettes_by_primary(
+    color: str,
+    delta_e: Annotated[float, Query(ge=0, le=100)] = 5,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 100,
+):
+    (rgb,) = _parse_colors(color, 1)
+    index = await _get_palette_index()
+    count, matches = index.within_primary(rgb_to_lab(rgb), delta_e, limit)
+    records = await asyncio.to_thread(palette_store.get_many, [row_id for row_id, _ in matches])
+    results = [{**record, "delta_e": distance} for record, (_, distance) in zip(records, matches)]
+    return {"count": count, "results": results}
+
+
+def _records_by_id(ids: list[int], rule_followed: bool | None):
+    for start in range(0, len(ids), 500):
+        for record in palette_store.get_many(ids[start : start + 500]):
+            if rule_followed is None or record["result"]["rule_followed"] == rule_followed:
+                yield record
+
+
+@app.get("/palettes/export")
+async def export_palettes(
+    format: str = "jsonl",
+    rule_followed: bool | None = None,
+    color: str | None = None,
+    delta_e: Annotated[float, Query(ge=0, le=100)] = 5,
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    if color is None:
+        records = palette_store.iter_records(rule_followed)
+    else:
+        (rgb,) = _parse_colors(color, 1)
+        index = await _get_palette_index()
+        _, matches = index.within_primary(rgb_to_lab(rgb), delta_e)
+        records = _records_by_id([row_id for row_id, _ in matches], rule_followed)
+
+    # Records are read a chunk at a time while the response is sent
+    if format == "csv":
+        return StreamingResponse(
+            export_lines(records, "csv"),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="palettes.csv"'},
+        )
+    return StreamingResponse(export_lines(records), media_type="application/x-ndjson")
@@ -0,0 +1,291 @@
+"""
+Check a whole folder of screenshots against the 60-30-10 rule.
+
+Run from the backend directory:
+    python -m audit ../image --output results.jsonl
+    python -m audit "screens/**/*.png" --output results.csv --workers 8 --engine minibatch
+
+Results are appended as each image finishes. Running the same command again resumes:
+images whose content and analysis options (including the decode limits of the current
+settings) already have a result in the output file are skipped.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from module.cache import build_color_options, result_key
+from module.ui_rules.engines import ENGINES
+from module.validation.image import SUPPORTED_FORMATS
+from module.worker.threads import default_threads, pin_threads
+from settings import settings
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp")
+ROLES = ("primary", "secondary", "accent")
+CSV_FIELDS = ["key", "path", "status", "rule_followed", "error"] + [
+    f"{role}_{field}" for role in ROLES for field in ("color", "percentage")
+]
+
+# Keys already present in the output file, set in every worker by _init_worker.
+_done_keys = frozenset()
+
+
+def find_images(patterns: list[str]):
+    """
+    Expand directories (searched recursively) and glob patterns into image paths.
+    :return: A sorted list of unique paths.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*")
+        for path in glob.iglob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.add(path)
+    return sorted(paths)
+
+
+def _init_worker(done_keys: frozenset, num_threads: int):
+    global _done_keys
+    _done_keys = done_keys
+    pin_threads(num_threads)
+
+
+def audit_file(path: str, acceptable_range: float, options: dict):
+    """
+    Analyse one image file. Executed inside a pool worker process.
+    :param options: engine, sample and sample_size for build_color_options.
+    :return: A record with the path, content key, status and result or error.
+    """
+    from module.validation import ImageHandler, ImageValidationError
+    from module.worker.tasks import analyze_60_30_10
+
+    with open(path, "rb") as f:
+        image_byte = f.read()
+    record = {"key": None, "path": path}
+    try:
+        # Reads the header only, so it is cheap enough to run before the skip check
+        info = ImageHandler(
+            image_byte,
+            max_pixels=settings.max_image_pixels,
+            max_frames=settings.max_image_frames,
+        ).validate()
+    except ImageValidationError as error:
+        return {**record, "status": "invalid", "error": str(error)}
+
+    try:
+        color_options = build_color_options(
+            info,
+            **options,
+            decode_max_pixels=settings.decode_max_pixels,
+            memory_budget=settings.analysis_memory_budget,
+        )
+    except ImageValidationError as error:
+        return {**record, "status": "invalid", "error": str(error)}
+    # Same key as the API's result cache for the same upload and options
+    record["key"] = result_key(image_byte, acceptable_range, color_options)
+    if record["key"] in _done_keys:
+        return {**record, "status": "skipped"}
+
+    try:
+        result, _ = analyze_60_30_10(
+            image_byte,
+            acceptable_range,
+            tile_workers=settings.tile_workers,
+            tile_min_pixels=settings.tile_min_pixels,
+            **color_options,
+        )
+    except Exception as error:
+        return {**record, "status": "failed", "error": str(error) or type(error).__name__}
+    return {**record, "status": "ok", "result": result}
+
+
+class ResultWriter:
+    def __init__(self, path: str):
+        """
+        Append audit records to a JSONL or CSV file, chosen by the file extension.
+        :param path: Output file; existing records are kept.
+        """
+        self.path = path
+        self.format = "csv" if path.lower().endswith(".csv") else "jsonl"
+        self._file = None
+        self._csv = None
+
+    def _drop_partial_record(self):
+        # An audit killed while writing leaves a last line without its newline; cut it
+        # so that it is neither parsed nor continued by the next record
+        with open(self.path, "rb+") as f:
+            size = end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                f.truncate(end)
+
+    def done_keys(self):
+        """
+        Read the keys of the records already analysed successfully, after removing a
+        partly written last record.
+        :return: A frozenset of keys.
+        """
+        if not os.path.exists(self.path):
+            return frozenset()
+        self._drop_partial_record()
+        with open(self.path, newline="") as f:
+            if self.format == "csv":
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            return frozenset(row["key"] for row in rows if row.get("status") == "ok")
+
+    def __enter__(self):
+        if os.path.exists(self.path):
+            self._drop_partial_record()
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, CSV_FIELDS)
+            if new:
+                self._csv.writeheader()
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    def write(self, record: dict):
+        if self.format == "jsonl":
+            self._file.write(json.dumps(record) + "\n")
+        else:
+            row = {field: record.get(field) for field in ("key", "path", "status", "error")}
+            result = record.get("result")
+            if result is not None:
+                row["rule_followed"] = result["rule_followed"]
+                for role in ROLES:
+                    color = result[f"{role}_color"]
+                    row[f"{role}_color"] = "#{:02x}{:02x}{:02x}".format(*color["color"])
+                    row[f"{role}_percentage"] = color["percentage"]
+            self._csv.writerow(row)
+        # Flush each record so an interrupted audit can resume from it.
+        self._file.flush()
+
+
+def _progress(counts: dict, total: int, started: float):
+    done = sum(counts.values())
+    elapsed = time.perf_counter() - started
+    rate = (done - counts["skipped"]) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\r{done}/{total} images  {rate:.1f} images/s  "
+        f"{counts['skipped']} skipped  {counts['invalid'] + counts['failed']} failed",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def run(
+    paths: list[str],
+    writer: ResultWriter,
+    acceptable_range: float,
+    options: dict,
+    workers: int,
+    threads: int | None = None,
+):
+    """
+    Analyse the images in a process pool and write each record as it finishes. A worker
+    that crashes (e.g. killed for using too much memory) fails the images it was given
+    and the pool is restarted for the rest.
+    :param threads: Native threads per worker (default divides the cores among the workers).
+    :return: Number of records per status.
+    """
+    counts = {"ok": 0, "skipped": 0, "invalid": 0, "failed": 0}
+    started = time.perf_counter()
+    done_keys = writer.done_keys()
+    # A few tasks per worker keep the pool busy without queueing every path at once.
+    max_pending = workers * 4
+    remaining = iter(paths)
+    with writer:
+        executor = None
+        pending = {}
+        try:
+            while True:
+                if executor is None:
+                    executor = ProcessPoolExecutor(
+                        max_workers=workers,
+                        initializer=_init_worker,
+                        initargs=(done_keys, threads or default_threads(workers)),
+                    )
+                for path in remaining:
+                    future = executor.submit(audit_file, path, acceptable_range, options)
+                    pending[future] = (path, executor)
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, owner = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as error:
+                        if isinstance(error, BrokenProcessPool) and owner is executor:
+                            executor.shutdown(wait=False)
+                            executor = None
+                        error = str(error) or type(error).__name__
+                        record = {"key": None, "path": path, "status": "failed", "error": error}
+                    counts[record["status"]] += 1
+                    if record["status"] != "skipped":
+                        writer.write(record)
+                _progress(counts, len(paths), started)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    print(file=sys.stderr)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of screenshots.")
+    parser.add_argument("--output", default="audit.jsonl", help="JSONL or CSV file (by extension).")
+    parser.add_argument("--workers", type=int, default=settings.analysis_workers)
+    parser.add_argument("--threads", type=int, default=None, help="Native threads per worker.")
+    parser.add_argument("--acceptable-range", type=float, default=5)
+    parser.add_argument("--engine", default="kmeans", choices=sorted(ENGINES))
+    parser.add_argument("--sample", default=None, choices=["uniform", "stratified"])
+    parser.add_argument("--sample-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    options = {"engine": args.engine, "sample": args.sample, "sample_size": args.sample_size}
+
+    paths = find_images(args.inputs)
+    if not paths:
+        print(f"No {', '.join(SUPPORTED_FORMATS)} images found.", file=sys.stderr)
+        return 1
+    counts = run(
+        paths,
+        ResultWriter(args.output),
+        args.acceptable_range,
+        options,
+        args.workers,
+        args.threads,
+    )
+    print(
+        f"{counts['ok']} analysed, {counts['skipped']} already done, "
+        f"{counts['invalid']} invalid, {counts['failed']} failed -> {args.output}",
+        file=sys.stderr,
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
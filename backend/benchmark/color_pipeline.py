@@ -0,0 +1,237 @@
+"""
+Benchmark every stage of the color pipeline.
+
+Run from the backend directory:
+    python -m benchmark.color_pipeline --output results.json
+    python -m benchmark.color_pipeline --save-baseline
+    python -m benchmark.color_pipeline --baseline benchmark/baseline.json --threshold 0.2
+    python -m benchmark.color_pipeline --max-peak-ratio 4
+
+Exits with status 1 when a stage is slower than the baseline by more than the threshold,
+or, with --max-peak-ratio, when the pipeline allocates more than that multiple of the
+decoded image size (measured with tracemalloc).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from module.ui_rules import UIRulesModule
+from module.ui_rules.color import ColorModule
+from module.ui_rules.sampling import sample_pixels
+from .memory import peak_rss, reset_peak_rss
+from .synthetic import RESOLUTIONS, load_cases
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _stages(image_byte: bytes, options: dict, state=None):
+    """
+    Yield (stage name, function) pairs; each function runs one stage on the previous output.
+    :param state: Dictionary the stages keep their outputs in (optional).
+    """
+    state = {} if state is None else state
+
+    def decode():
+        state["module"] = ColorModule(image_byte, **options)
+
+    def sample():
+        module = state["module"]
+        image = module.image
+        if module.sample is not None:
+            # As in ColorModule.extract_dominant_colors: only foreground pixels are sampled
+            foreground = module._remove_background(image)
+            pixels = sample_pixels(
+                image, module.sample, module.sample_size, module.seed, mask=foreground
+            )
+            image = pixels.reshape(-1, 1, 3)
+        state["image"] = image
+
+    def remove_background():
+        state["foreground"] = state["module"]._remove_background(state["image"])
+
+    def filter_pixels():
+        state["colors"] = state["module"]._filter_pixels(state["image"], state["foreground"])
+
+    def cluster():
+        state["dominant_colors"] = state["module"]._cluster(*state["colors"])
+
+    def rules():
+        UIRulesModule.evaluate_60_30_10(state["dominant_colors"])
+
+    return [
+        ("decode", decode),
+        ("sample", sample),
+        ("remove_background", remove_background),
+        ("filter", filter_pixels),
+        ("cluster", cluster),
+        ("rules", rules),
+    ]
+
+
+def _measure_case(image_byte: bytes, options: dict, repeat: int):
+    results = {}
+
+    # Timing runs, without tracemalloc slowing them down
+    for _ in range(repeat):
+        for name, stage in _stages(image_byte, options):
+            start = time.perf_counter()
+            stage()
+            results.setdefault(name, {"wall_times": []})["wall_times"].append(
+                time.perf_counter() - start
+            )
+
+    # One run with allocation and RSS tracking
+    state = {}
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        pipeline_peak = 0
+        for name, stage in _stages(image_byte, options, state):
+            reset_peak_rss()
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            stage()
+            after, peak = tracemalloc.get_traced_memory()
+            pipeline_peak = max(pipeline_peak, peak - start)
+            results[name].update(
+                alloc_peak_bytes=peak - before,
+                alloc_net_bytes=after - before,
+                peak_rss_bytes=peak_rss(),
+            )
+    finally:
+        tracemalloc.stop()
+
+    for stats in results.values():
+        times = stats.pop("wall_times")
+        stats["wall_time"] = statistics.median(times)
+        stats["wall_time_min"] = min(times)
+    # Peak allocation of the whole pipeline relative to the decoded RGB image
+    image_bytes = state["module"].image.nbytes
+    memory = {
+        "image_bytes": image_bytes,
+        "alloc_peak_bytes": pipeline_peak,
+        "peak_ratio": pipeline_peak / image_bytes if image_bytes else 0.0,
+    }
+    return results, memory
+
+
+def run(cases, options: dict, repeat: int = 3, log=print):
+    """
+    Benchmark every case.
+    :param cases: A list of (name, image bytes) tuples.
+    :param options: Options passed to ColorModule.
+    :param repeat: Number of timed runs per case; the median is reported.
+    :return: A JSON-serializable dictionary of results.
+    """
+    report = {
+        "options": options,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "cases": {},
+    }
+    for name, image_byte in cases:
+        stages, memory = _measure_case(image_byte, options, repeat)
+        report["cases"][name] = {"bytes": len(image_byte), "stages": stages, "memory": memory}
+        total = sum(stage["wall_time"] for stage in stages.values())
+        log(f"{name:40s} {total * 1000:9.1f} ms  x{memory['peak_ratio']:4.1f} mem  " + "  ".join(
+            f"{stage}={stats['wall_time'] * 1000:.1f}" for stage, stats in stages.items()
+        ))
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_seconds: float = 0.005):
+    """
+    Find stages that got slower than the baseline.
+    :param threshold: Allowed relative slowdown, e.g. 0.2 for 20%.
+    :param min_seconds: Stages faster than this in the baseline are ignored as noise.
+    :return: A list of regression descriptions.
+    """
+    regressions = []
+    for case, result in report["cases"].items():
+        base_case = baseline.get("cases", {}).get(case)
+        if base_case is None:
+            continue
+        for stage, stats in result["stages"].items():
+            base = base_case["stages"].get(stage)
+            if base is None or base["wall_time"] < min_seconds:
+                continue
+            ratio = stats["wall_time"] / base["wall_time"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{case} / {stage}: {base['wall_time'] * 1000:.1f} ms -> "
+                    f"{stats['wall_time'] * 1000:.1f} ms ({(ratio - 1) * 100:+.0f}%)"
+                )
+    return regressions
+
+
+def check_memory(report: dict, max_peak_ratio: float):
+    """
+    Find cases whose peak allocation exceeds a multiple of the decoded image size.
+    :return: A list of violation descriptions.
+    """
+    return [
+        f"{case}: peak allocation {result['memory']['peak_ratio']:.1f}x the decoded image "
+        f"(limit {max_peak_ratio:.1f}x)"
+        for case, result in report["cases"].items()
+        if result["memory"]["peak_ratio"] > max_peak_ratio
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--resolutions", nargs="*", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--no-repo-images", action="store_true", help="Only use synthetic images.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--engine", default="kmeans")
+    parser.add_argument("--sample", default=None, choices=["uniform", "stratified"])
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown (default 0.2).")
+    parser.add_argument(
+        "--max-peak-ratio",
+        type=float,
+        default=None,
+        help="Fail when a case allocates more than this multiple of its decoded image (e.g. 4).",
+    )
+    args = parser.parse_args(argv)
+
+    options = {"engine": args.engine}
+    if args.sample:
+        options.update(sample=args.sample, seed=0)
+
+    cases = load_cases(args.resolutions, include_repo_images=not args.no_repo_images)
+    report = run(cases, options, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = []
+    if args.max_peak_ratio is not None:
+        regressions += check_memory(report, args.max_peak_ratio)
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions += compare(report, baseline, args.threshold)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Load-test POST /603010 and report latency percentiles, throughput, errors and memory.
+
+Run from the backend directory:
+    python -m benchmark.load --concurrency 8 --duration 30
+    python -m benchmark.load --rate 5 --duration 60 --mix synthetic-1080p=3 png=1 --output load.json
+    python -m benchmark.load --server uvicorn --workers 4 --concurrency 16
+
+By default the app is driven in this process through an ASGI transport, with its
+lifespan, so no port or server is involved; --server uvicorn starts a local uvicorn
+instead and measures the full HTTP stack. --concurrency keeps that many requests in
+flight (closed loop); --rate sends requests at random arrival times averaging that many
+per second (open loop), and latency then counts from the scheduled send time so a slow
+server cannot hide its queueing. The result cache is disabled unless --cache is given,
+so every request runs an analysis.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from .memory import child_pids, current_rss, process_rss
+from .synthetic import RESOLUTIONS, load_cases
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values, fraction: float):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def parse_mix(entries: list[str], cases):
+    """
+    Weight the cases by name.
+    :param entries: "pattern=weight" strings; a case gets the weight of the first pattern
+        contained in its name. Cases matching no pattern are left out. No entries weights
+        every case equally.
+    :param cases: (name, image bytes) tuples from load_cases.
+    :return: A list of (name, image bytes, weight) tuples with a positive weight.
+    """
+    if not entries:
+        return [(name, image, 1.0) for name, image in cases]
+    patterns = []
+    for entry in entries:
+        pattern, _, weight = entry.rpartition("=")
+        if not pattern:
+            raise ValueError(f"Expected pattern=weight, got {entry!r}")
+        patterns.append((pattern, float(weight)))
+    mix = []
+    for name, image in cases:
+        weight = next((weight for pattern, weight in patterns if pattern in name), 0)
+        if weight > 0:
+            mix.append((name, image, weight))
+    if not mix:
+        raise ValueError("No image matches the mix")
+    return mix
+
+
+class LoadRecorder:
+    def __init__(self, started: float):
+        """
+        Collect the outcome of every request and periodic memory readings.
+        :param started: Event loop time at which the run started.
+        """
+        self.started = started
+        self.requests = []
+        self.timeline = []
+
+    def record(self, name: str, latency: float, status):
+        """
+        :param status: HTTP status code, or the exception name when no response came back.
+        """
+        self.requests.append((name, latency, status))
+
+    def sample(self, now: float, server_pid: int, worker_pids: list[int]):
+        workers = {pid: process_rss(pid) for pid in worker_pids}
+        workers = {pid: rss for pid, rss in workers.items() if rss is not None}
+        self.timeline.append(
+            {
+                "seconds": now - self.started,
+                "completed": len(self.requests),
+                "errors": sum(1 for _, _, status in self.requests if status != 200),
+                "server_rss": current_rss() if server_pid == os.getpid() else process_rss(server_pid),
+                "worker_rss": sum(workers.values()),
+                "workers": len(workers),
+            }
+        )
+
+    def summary(self, elapsed: float):
+        latencies = [latency for _, latency, status in self.requests if status == 200]
+        statuses = {}
+        for _, _, status in self.requests:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = len(self.requests) - len(latencies)
+        summary = {
+            "requests": len(self.requests),
+            "errors": errors,
+            "error_rate": errors / len(self.requests) if self.requests else 0.0,
+            "statuses": statuses,
+            "seconds": elapsed,
+            "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency": None,
+            "peak_worker_rss": max((sample["worker_rss"] for sample in self.timeline), default=None),
+        }
+        if latencies:
+            summary["latency"] = {
+                "mean": statistics.fmean(latencies),
+                "p50": _percentile(latencies, 0.50),
+                "p95": _percentile(latencies, 0.95),
+                "p99": _percentile(latencies, 0.99),
+                "max": max(latencies),
+            }
+        return summary
+
+
+async def _send(client: httpx.AsyncClient, recorder: LoadRecorder, case, params: dict, scheduled: float):
+    name, image, _ = case
+    loop = asyncio.get_running_loop()
+    try:
+        response = await client.post(
+            "/603010", params=params, files={"image": (name, image, "application/octet-stream")}
+        )
+        status = response.status_code
+    except Exception as error:
+        # A failed request is counted towards the error rate instead of ending the run
+        status = type(error).__name__
+    recorder.record(name, loop.time() - scheduled, status)
+
+
+async def _closed_loop(send, pick, concurrency: int, deadline: float, max_requests: int | None):
+    loop = asyncio.get_running_loop()
+    sent = 0
+
+    async def user():
+        nonlocal sent
+        while loop.time() < deadline and (max_requests is None or sent < max_requests):
+            sent += 1
+            await send(pick(), loop.time())
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def _open_loop(send, pick, rate: float, deadline: float, max_requests: int | None, rng):
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    scheduled = loop.time()
+    while scheduled < deadline and (max_requests is None or len(tasks) < max_requests):
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        tasks.add(asyncio.create_task(send(pick(), scheduled)))
+        scheduled += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+
+async def _sample_memory(recorder: LoadRecorder, server_pid: int, worker_pids, interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        recorder.sample(loop.time(), server_pid, worker_pids())
+        await asyncio.sleep(interval)
+
+
+async def drive(client, server_pid: int, worker_pids, mix, args):
+    """
+    Send requests until the duration or the request count is reached.
+    :param worker_pids: Function returning the process ids of the analysis workers.
+    :return: A tuple (summary, timeline).
+    """
+    rng = random.Random(args.seed)
+    weights = [weight for _, _, weight in mix]
+    params = {"engine": args.engine}
+    loop = asyncio.get_running_loop()
+    recorder = LoadRecorder(loop.time())
+    deadline = recorder.started + args.duration
+
+    def pick():
+        return rng.choices(mix, weights)[0]
+
+    def send(case, scheduled):
+        return _send(client, recorder, case, params, scheduled)
+
+    sampler = asyncio.create_task(_sample_memory(recorder, server_pid, worker_pids, args.interval))
+    try:
+        if args.rate:
+            await _open_loop(send, pick, args.rate, deadline, args.requests, rng)
+        else:
+            await _closed_loop(send, pick, args.concurrency, deadline, args.requests)
+    finally:
+        sampler.cancel()
+    elapsed = loop.time() - recorder.started
+    recorder.sample(loop.time(), server_pid, worker_pids())
+    return recorder.summary(elapsed), recorder.timeline
+
+
+async def run_asgi(mix, args):
+    """
+    Drive the app in this process through httpx's ASGI transport.
+    """
+    import app as backend
+
+    # Unhandled exceptions in the app become 500 responses, as they do behind a server
+    transport = httpx.ASGITransport(app=backend.app, raise_app_exceptions=False)
+    async with backend.app.router.lifespan_context(backend.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=args.timeout
+        ) as client:
+            return await drive(client, os.getpid(), backend.pool.worker_pids, mix, args)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _analysis_workers(pid: int):
+    # The pool's workers are the server's children, apart from multiprocessing's helper
+    workers = []
+    for child in child_pids(pid):
+        try:
+            with open(f"/proc/{child}/cmdline", "rb") as f:
+                if b"resource_tracker" in f.read():
+                    continue
+        except OSError:
+            continue
+        workers.append(child)
+    return workers
+
+
+async def run_uvicorn(mix, args):
+    """
+    Start uvicorn on a free local port and drive it over HTTP.
+    """
+    port = args.port or _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=args.timeout
+        ) as client:
+            for _ in range(300):
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    (await client.get("/")).raise_for_status()
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start within 30 seconds")
+            return await drive(client, server.pid, lambda: _analysis_workers(server.pid), mix, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def _configure(args, directory: str):
+    # Settings are read when app is imported, by this process or by uvicorn
+    if not args.cache:
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ["RESULT_CACHE_DIR"] = ""
+    os.environ["JOB_DB"] = os.path.join(directory, "jobs.sqlite3")
+    os.environ["PALETTE_DB"] = os.path.join(directory, "palettes.sqlite3")
+    if args.workers:
+        os.environ["ANALYSIS_WORKERS"] = str(args.workers)
+    if args.queue_size is not None:
+        os.environ["ANALYSIS_QUEUE_SIZE"] = str(args.queue_size)
+    if args.warmup:
+        os.environ["WARMUP"] = "1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--server", default="asgi", choices=["asgi", "uvicorn"])
+    parser.add_argument("--port", type=int, help="Port for uvicorn (default is a free one).")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=4, help="Requests kept in flight.")
+    load.add_argument("--rate", type=float, help="Average requests per second (open loop).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send requests for.")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests.")
+    parser.add_argument("--resolutions", nargs="*", default=["1080p"], choices=list(RESOLUTIONS))
+    parser.add_argument("--no-repo-images", action="store_true", help="Only use synthetic images.")
+    parser.add_argument("--mix", nargs="*", default=[], help="pattern=weight per image name.")
+    parser.add_argument("--engine", default="kmeans")
+    parser.add_argument("--workers", type=int, help="ANALYSIS_WORKERS for the server.")
+    parser.add_argument("--queue-size", type=int, help="ANALYSIS_QUEUE_SIZE for the server.")
+    parser.add_argument("--warmup", action="store_true", help="Start the server with WARMUP=1.")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled.")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds before a request fails.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between memory samples.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix, load_cases(args.resolutions, not args.no_repo_images))
+    with tempfile.TemporaryDirectory() as directory:
+        _configure(args, directory)
+        runner = run_uvicorn if args.server == "uvicorn" else run_asgi
+        summary, timeline = asyncio.run(runner(mix, args))
+
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "port")
+        },
+        "images": {name: weight for name, _, weight in mix},
+        "cpu_count": os.cpu_count(),
+        "created": time.time(),
+        "summary": summary,
+        "timeline": timeline,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    latency = summary["latency"]
+    print(
+        f"{summary['requests']} requests in {summary['seconds']:.1f}s  "
+        f"{summary['throughput']:.2f} req/s  error rate {summary['error_rate']:.1%}  {summary['statuses']}"
+    )
+    if latency:
+        print(
+            "latency  "
+            + "  ".join(f"{key} {latency[key] * 1000:.0f}ms" for key in ("p50", "p95", "p99", "max"))
+        )
+    if summary["peak_worker_rss"]:
+        print(f"peak worker RSS {summary['peak_worker_rss'] / 2**20:.0f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
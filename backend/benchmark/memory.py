@@ -0,0 +1,75 @@
+import os
+import resource
+
+
+def _read_status(field: str, pid="self"):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (None when unknown).
+    """
+    return _read_status("VmRSS")
+
+
+def process_rss(pid: int):
+    """
+    Resident set size of another process in bytes (None when unknown or exited).
+    """
+    return _read_status("VmRSS", pid)
+
+
+def child_pids(pid: int):
+    """
+    Process ids of the direct children of a process (Linux only, empty elsewhere).
+    """
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so parse after its closing parenthesis
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS counter so the next reading covers one stage (Linux only).
+    :return: True if the counter was reset.
+    """
+    try:
+        with open(f"/proc/{os.getpid()}/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes.
+    """
+    peak = _read_status("VmHWM")
+    if peak is not None:
+        return peak
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
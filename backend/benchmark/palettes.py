@@ -0,0 +1,129 @@
+"""
+Check and time palette searches on a large palette store.
+
+Run from the backend directory:
+    python -m benchmark.palettes
+    python -m benchmark.palettes --records 500000 --queries 200 --output palettes.json
+
+Fills a temporary store with random palettes, builds the index, adds more palettes so
+that the pending list is searched too, and compares every similar-palette and ΔE query
+with a brute-force scan of all palettes. Exits with status 1 when the results differ.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+from module.palettes import PaletteIndex, PaletteStore, palette_vector, rgb_to_lab
+from module.palettes.lab import ROLES
+
+
+def random_result(rng):
+    colors = rng.integers(0, 256, size=(3, 3)).tolist()
+    percentages = sorted(rng.dirichlet([6, 3, 1]) * 100, reverse=True)
+    return {
+        **{
+            f"{role}_color": {"color": color, "percentage": percentage}
+            for role, color, percentage in zip(ROLES, colors, percentages)
+        },
+        "rule_followed": bool(rng.random() < 0.3),
+        "details": {},
+    }
+
+
+def _time(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def run(records: int, added: int, queries: int, limit: int, delta_e: float, seed: int = 0):
+    """
+    :return: A report with build and query times and the number of mismatching queries.
+    """
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        store = PaletteStore(os.path.join(directory, "palettes.sqlite3"))
+        _, insert_seconds = _time(
+            lambda: store.add_many(
+                (f"key-{i}", f"image-{i}", random_result(rng)) for i in range(records)
+            )
+        )
+        index = PaletteIndex(store)
+        _, build_seconds = _time(index.load)
+        for i in range(added):
+            stored = store.add(f"added-{i}", f"added-{i}", random_result(rng))
+            index.add(*stored)
+
+        ids, vectors = store.vectors()
+        ids, vectors = np.array(ids), np.array(vectors)
+        store.close()
+
+    timings = {"similar": [], "similar_scan": [], "primary": [], "primary_scan": []}
+    mismatches = 0
+    for _ in range(queries):
+        query = palette_vector(random_result(rng))
+        matches, seconds = _time(lambda: index.similar(query, limit))
+        timings["similar"].append(seconds)
+        distances, seconds = _time(lambda: np.linalg.norm(vectors - query, axis=1))
+        timings["similar_scan"].append(seconds)
+        expected = np.sort(distances)[:limit]
+        mismatches += not np.allclose([distance for _, distance in matches], expected)
+
+        lab = rgb_to_lab(rng.integers(0, 256, size=3).tolist())
+        (count, matches), seconds = _time(lambda: index.within_primary(lab, delta_e))
+        timings["primary"].append(seconds)
+        distances, seconds = _time(lambda: np.linalg.norm(vectors[:, :3] - lab, axis=1))
+        timings["primary_scan"].append(seconds)
+        mismatches += sorted(row_id for row_id, _ in matches) != sorted(
+            ids[distances <= delta_e].tolist()
+        )
+
+    return {
+        "records": records + added,
+        "pending": added,
+        "queries": queries,
+        "insert_seconds": insert_seconds,
+        "build_seconds": build_seconds,
+        "median_seconds": {name: statistics.median(values) for name, values in timings.items()},
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--added", type=int, default=1000, help="Palettes added after the build.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--delta-e", type=float, default=5)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    report = run(args.records, args.added, args.queries, args.limit, args.delta_e)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    median = report["median_seconds"]
+    print(
+        f"{report['records']} palettes  insert {report['insert_seconds']:.1f}s  "
+        f"build {report['build_seconds']:.2f}s"
+    )
+    for name in ("similar", "primary"):
+        print(
+            f"  {name:<8} index {median[name] * 1000:>7.2f} ms  "
+            f"scan {median[name + '_scan'] * 1000:>7.2f} ms"
+        )
+    if report["mismatches"]:
+        print(f"MISMATCH {report['mismatches']} queries differ from a full scan", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Measure how long the backend takes to start and to answer its first analysis.
+
+Each run starts a fresh interpreter, so imports are cold. Run from the backend directory:
+    python -m benchmark.startup
+    python -m benchmark.startup --runs 5 --max-import-seconds 1.0 --output startup.json
+
+Exits with status 1 when importing the app takes longer than --max-import-seconds or
+loads one of the heavy modules listed in HEAVY_MODULES.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported when an analysis actually runs.
+HEAVY_MODULES = ("numpy", "PIL", "cv2", "sklearn", "torch")
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+from fastapi.testclient import TestClient
+from module.worker.tasks import warm_up_image
+image = warm_up_image()
+with TestClient(app.app) as client:
+    ready = time.perf_counter()
+    response = client.post("/603010", files={{"image": ("warmup.png", image, "image/png")}})
+    response.raise_for_status()
+    answered = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "startup_seconds": ready - imported,
+    "first_request_seconds": answered - ready,
+    "heavy_modules": heavy,
+}}))
+"""
+
+
+def measure(warmup: bool, workers: int):
+    """
+    Start the app in a new interpreter and time its import, startup and first request.
+    :param warmup: Value of the WARMUP setting.
+    :param workers: Number of analysis worker processes.
+    :return: A dictionary of durations in seconds and the heavy modules loaded by import.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        # Keep the job and palette databases of the measured app out of the backend directory
+        env = dict(
+            os.environ,
+            WARMUP=str(int(warmup)),
+            ANALYSIS_WORKERS=str(workers),
+            RESULT_CACHE_SIZE="0",
+            RESULT_CACHE_DIR="",
+            JOB_DB=os.path.join(directory, "jobs.sqlite3"),
+            PALETTE_DB=os.path.join(directory, "palettes.sqlite3"),
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", _CHILD.format(heavy=HEAVY_MODULES)],
+            cwd=BACKEND_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int, workers: int):
+    report = {"runs": runs, "workers": workers, "modes": {}}
+    for warmup in (False, True):
+        samples = [measure(warmup, workers) for _ in range(runs)]
+        mode = {
+            key: statistics.median(sample[key] for sample in samples)
+            for key in ("import_seconds", "startup_seconds", "first_request_seconds")
+        }
+        mode["heavy_modules"] = sorted({name for sample in samples for name in sample["heavy_modules"]})
+        report["modes"]["warmup" if warmup else "cold"] = mode
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2, help="Analysis worker processes.")
+    parser.add_argument("--max-import-seconds", type=float, default=1.0)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs, args.workers)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{'mode':<8} {'import':>10} {'startup':>10} {'first request':>14}")
+    for name, mode in report["modes"].items():
+        print(
+            f"{name:<8} {mode['import_seconds'] * 1000:>8.0f}ms {mode['startup_seconds'] * 1000:>8.0f}ms "
+            f"{mode['first_request_seconds'] * 1000:>12.0f}ms"
+        )
+
+    failures = []
+    for name, mode in report["modes"].items():
+        if mode["import_seconds"] > args.max_import_seconds:
+            failures.append(f"{name}: importing app took {mode['import_seconds']:.2f}s")
+        if mode["heavy_modules"]:
+            failures.append(f"{name}: importing app loaded {', '.join(mode['heavy_modules'])}")
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import io
+import os
+import numpy as np
+from PIL import Image
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+IMAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "image")
+
+
+def synthetic_ui(width: int, height: int, seed: int = 0):
+    """
+    Draw a flat UI mockup close to the 60-30-10 rule.
+    :param width: Image width in pixels.
+    :param height: Image height in pixels.
+    :param seed: Seed for the random layout.
+    :return: A numpy array of RGB pixels (height, width, 3).
+    """
+    rng = np.random.default_rng(seed)
+    primary, secondary, accent = rng.integers(16, 240, size=(3, 3), dtype=np.uint8)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = primary
+
+    # Sidebar and header in the secondary color
+    image[:, : int(width * 0.22)] = secondary
+    image[: int(height * 0.1), :] = secondary
+
+    # Buttons in the accent color
+    for _ in range(12):
+        w, h = int(width * 0.08), int(height * 0.05)
+        x = rng.integers(int(width * 0.25), width - w)
+        y = rng.integers(int(height * 0.15), height - h)
+        image[y : y + h, x : x + w] = accent
+
+    # Anti-aliased "text": a few rows of blended colors add realistic distinct values
+    for _ in range(40):
+        y = rng.integers(0, height - 4)
+        x = rng.integers(0, width // 2)
+        length = rng.integers(width // 20, width // 4)
+        alpha = rng.random((4, length, 1))
+        row = image[y : y + 4, x : x + length].astype(np.float32)
+        image[y : y + 4, x : x + length] = (row * alpha + 20 * (1 - alpha)).astype(np.uint8)
+    return image
+
+
+def encode_png(image):
+    """
+    Encode RGB pixels as PNG bytes.
+    :param image: A numpy array of RGB pixels.
+    :return: PNG file bytes.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def load_cases(resolutions=("720p", "1080p", "4k", "8k"), include_repo_images=True):
+    """
+    Collect the images to benchmark.
+    :param resolutions: Names from RESOLUTIONS to generate synthetic UIs for.
+    :param include_repo_images: Also use the screenshots in the repo's image/ directory.
+    :return: A list of (name, image bytes) tuples.
+    """
+    cases = []
+    if include_repo_images and os.path.isdir(IMAGE_DIR):
+        for name in sorted(os.listdir(IMAGE_DIR)):
+            if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+                with open(os.path.join(IMAGE_DIR, name), "rb") as f:
+                    cases.append((name, f.read()))
+    for resolution in resolutions:
+        width, height = RESOLUTIONS[resolution]
+        cases.append((f"synthetic-{resolution}", encode_png(synthetic_ui(width, height))))
+    return cases
@@ -0,0 +1,99 @@
+"""
+Measure analysis throughput as the number of worker processes and native threads varies.
+
+Run from the backend directory:
+    python -m benchmark.threads
+    python -m benchmark.threads --workers 1 2 4 8 --threads 1 2 4 8 --jobs 64 --output threads.json
+
+For every combination, a warmed-up process pool analyses the same mix of images; the
+report holds throughput and per-analysis latency percentiles, so oversubscribed
+combinations (workers x threads above the core count) show up as a drop in throughput
+and a jump in p99.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from module.worker.tasks import analyze_60_30_10, init_worker
+from .synthetic import RESOLUTIONS, load_cases
+
+
+def _timed_analysis(image_byte: bytes, options: dict):
+    started = time.perf_counter()
+    analyze_60_30_10(image_byte, **options)
+    return time.perf_counter() - started
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def _percentile(values, fraction: float):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(cases, workers: int, threads: int, jobs: int, options: dict):
+    """
+    Analyse `jobs` images, cycling through the cases, with a fresh pool.
+    :return: Throughput in analyses per second and latency percentiles in seconds.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(threads, True)
+    ) as executor:
+        # Start every worker and let it finish warming up before timing
+        list(executor.map(_worker_pid, range(workers)))
+        started = time.perf_counter()
+        futures = [
+            executor.submit(_timed_analysis, cases[i % len(cases)][1], options)
+            for i in range(jobs)
+        ]
+        latencies = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "threads": threads,
+        "throughput": jobs / elapsed,
+        "latency_p50": statistics.median(latencies),
+        "latency_p99": _percentile(latencies, 0.99),
+    }
+
+
+def main(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", nargs="*", type=int, default=sorted({1, 2, cpu_count}))
+    parser.add_argument("--threads", nargs="*", type=int, default=sorted({1, 2, cpu_count}))
+    parser.add_argument("--jobs", type=int, default=32, help="Analyses per combination.")
+    parser.add_argument("--resolutions", nargs="*", default=["1080p"], choices=list(RESOLUTIONS))
+    parser.add_argument("--no-repo-images", action="store_true", help="Only use synthetic images.")
+    parser.add_argument("--engine", default="kmeans")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.resolutions, include_repo_images=not args.no_repo_images)
+    options = {"engine": args.engine}
+    report = {"cpu_count": cpu_count, "jobs": args.jobs, "options": options, "results": []}
+    print(f"{'workers':>7} {'threads':>7} {'analyses/s':>11} {'p50':>9} {'p99':>9}")
+    for workers in args.workers:
+        for threads in args.threads:
+            result = measure(cases, workers, threads, args.jobs, options)
+            report["results"].append(result)
+            flag = "  oversubscribed" if workers * threads > cpu_count else ""
+            print(
+                f"{workers:>7} {threads:>7} {result['throughput']:>11.2f} "
+                f"{result['latency_p50'] * 1000:>7.0f}ms {result['latency_p99'] * 1000:>7.0f}ms{flag}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Compare tile-parallel color counting with the single-block path.
+
+Run from the backend directory:
+    python -m benchmark.tiles
+    python -m benchmark.tiles --resolutions 8k --workers 1 2 4 8 --output tiles.json
+
+For every image and thread count, checks that the merged tile counts equal the
+single-block counts and reports the filter wall time and speed-up. Exits with status 1
+when the results differ.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import numpy as np
+from module.ui_rules.color import ColorModule
+from .synthetic import RESOLUTIONS, load_cases
+
+
+def _time(fn, repeat: int):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return result, statistics.median(durations)
+
+
+def _single_block(module: ColorModule):
+    return module._filter_pixels(module.image, module._remove_background(module.image))
+
+
+def run(cases, workers: list[int], repeat: int = 3):
+    """
+    :return: A report with, per case, the single-block time and per thread count the tile
+        time, the speed-up and whether colors and counts match.
+    """
+    report = {"cpu_count": os.cpu_count(), "repeat": repeat, "cases": {}}
+    for name, image_byte in cases:
+        module = ColorModule(image_byte)
+        (colors, weights), single_seconds = _time(lambda: _single_block(module), repeat)
+        case = {
+            "megapixels": module.image.shape[0] * module.image.shape[1] / 1_000_000,
+            "colors": len(colors),
+            "single_block_seconds": single_seconds,
+            "tiles": {},
+        }
+        for count in workers:
+            module.tile_workers = count
+            (tile_colors, tile_weights), seconds = _time(
+                lambda: module._filter_tiles(module.image), repeat
+            )
+            case["tiles"][count] = {
+                "seconds": seconds,
+                "speedup": single_seconds / seconds if seconds else None,
+                "matches": bool(
+                    np.array_equal(colors, tile_colors) and np.array_equal(weights, tile_weights)
+                ),
+            }
+        report["cases"][name] = case
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--resolutions", nargs="*", default=["4k", "8k"], choices=list(RESOLUTIONS))
+    parser.add_argument("--no-repo-images", action="store_true", help="Only use synthetic images.")
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    cases = load_cases(args.resolutions, include_repo_images=not args.no_repo_images)
+    report = run(cases, sorted(set(args.workers)), repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    mismatches = []
+    for name, case in report["cases"].items():
+        print(f"{name}  {case['megapixels']:.1f} MP  single block {case['single_block_seconds'] * 1000:.0f} ms")
+        for count, stats in case["tiles"].items():
+            print(
+                f"  {count:>3} threads  {stats['seconds'] * 1000:>7.0f} ms  "
+                f"x{stats['speedup']:.2f}  {'ok' if stats['matches'] else 'MISMATCH'}"
+            )
+            if not stats["matches"]:
+                mismatches.append(f"{name} with {count} threads")
+    for mismatch in mismatches:
+        print(f"MISMATCH {mismatch}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
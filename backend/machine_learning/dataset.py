@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import Dataset
+from .paths import LABELS_FILE
+
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip("#")
+    return [int(hex_color[i : i + 2], 16) for i in (0, 2, 4)]
+
+
+def _labels(item):
+    colors = item["color"]
+    return [hex_to_rgb(colors[key]) for key in ("primary", "secondary", "accent")]
+
+
+class DominantColorDataset(Dataset):
+    def __init__(self, json_file, img_dir, transform=None):
+        with open(json_file, "r") as f:
+            self.data = json.load(f)
+        self.img_dir = img_dir
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        img_name = os.path.join(self.img_dir, self.data[idx]["name"])
+        image = Image.open(img_name).convert("RGB")
+        labels = (
+            torch.tensor(_labels(self.data[idx]), dtype=torch.float32) / 255.0
+        )  # Normalize labels
+
+        if self.transform:
+            image = self.transform(image)
+
+        return image, labels
+
+
+def shard_key(img_dir: str):
+    """
+    Fingerprint of an annotated image set: a hash of the labels file and of the name,
+    size and modification time of every other file in the directory.
+    :param img_dir: Directory with the images and "Result Data.json".
+    :return: A hex digest that changes whenever an image or an annotation does.
+    """
+    digest = hashlib.sha256()
+    with open(os.path.join(img_dir, LABELS_FILE), "rb") as f:
+        digest.update(f.read())
+    for name in sorted(os.listdir(img_dir)):
+        if name == LABELS_FILE:
+            continue
+        stat = os.stat(os.path.join(img_dir, name))
+        digest.update(f"\0{name}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _replace(shard_dir: str, name: str, write):
+    # Write to a temporary file and rename it, so readers never see a partial file
+    path = os.path.join(shard_dir, name)
+    with open(path + ".tmp", "wb") as f:
+        write(f)
+    os.replace(path + ".tmp", path)
+
+
+def build_shard(img_dir: str, shard_dir: str, size: int = 128, log=print):
+    """
+    Decode, resize and store an annotated image set once, for ShardDataset.
+    Writes images.npy (n, size, size, 3) uint8, labels.npy (n, 3, 3) float32, names.json
+    and key.txt, the shard_key of the image set.
+    :param img_dir: Directory with the images and "Result Data.json".
+    :param shard_dir: Directory to write the shard to.
+    :param size: Width and height the images are resized to (the model input size).
+    """
+    key = shard_key(img_dir)
+    with open(os.path.join(img_dir, LABELS_FILE), "r") as f:
+        data = json.load(f)
+    os.makedirs(shard_dir, exist_ok=True)
+    # Invalidate the old shard first; key.txt is written last, once every file is in place
+    try:
+        os.remove(os.path.join(shard_dir, "key.txt"))
+    except FileNotFoundError:
+        pass
+
+    # Write through a memory map so the full set never has to fit in memory
+    images = np.lib.format.open_memmap(
+        os.path.join(shard_dir, "images.npy.tmp"),
+        mode="w+",
+        dtype=np.uint8,
+        shape=(len(data), size, size, 3),
+    )
+    for i, item in enumerate(data):
+        image = Image.open(os.path.join(img_dir, item["name"])).convert("RGB")
+        images[i] = np.asarray(image.resize((size, size), Image.BILINEAR))
+    images.flush()
+    del images
+    os.replace(
+        os.path.join(shard_dir, "images.npy.tmp"), os.path.join(shard_dir, "images.npy")
+    )
+
+    labels = np.array([_labels(item) for item in data], dtype=np.float32) / 255.0
+    _replace(shard_dir, "labels.npy", lambda f: np.save(f, labels))
+    names = json.dumps([item["name"] for item in data]).encode()
+    _replace(shard_dir, "names.json", lambda f: f.write(names))
+    _replace(shard_dir, "key.txt", lambda f: f.write(key.encode()))
+    log(f"Wrote {len(data)} images to {shard_dir}")
+    return shard_dir
+
+
+def shard_exists(shard_dir: str, img_dir: str):
+    """
+    :return: True if shard_dir holds a complete shard of the current img_dir.
+    """
+    try:
+        with open(os.path.join(shard_dir, "key.txt"), "r") as f:
+            return f.read() == shard_key(img_dir)
+    except FileNotFoundError:
+        return False
+
+
+class ShardDataset(Dataset):
+    def __init__(self, shard_dir: str, transform=None):
+        """
+        Dataset reading pre-decoded images from a shard written by build_shard.
+        The shard is memory-mapped, so DataLoader workers share the same pages.
+        :param shard_dir: Directory written by build_shard.
+        :param transform: Transform applied to the PIL image (e.g. augmentation).
+        """
+        self.shard_dir = shard_dir
+        self.transform = transform
+        self.labels = np.load(os.path.join(shard_dir, "labels.npy"))
+        self._images = None
+
+    @property
+    def images(self):
+        # Opened on first access so every DataLoader worker maps the file itself
+        if self._images is None:
+            self._images = np.load(os.path.join(self.shard_dir, "images.npy"), mmap_mode="r")
+        return self._images
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        image = Image.fromarray(self.images[idx])
+        labels = torch.from_numpy(self.labels[idx])
+
+        if self.transform:
+            image = self.transform(image)
+
+        return image, labels
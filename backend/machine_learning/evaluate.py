@@ -0,0 +1,279 @@
+"""
+Score every color backend against the labelled evaluation set, without a display.
+
+Run from the backend directory:
+    python -m machine_learning.evaluate --output-dir evaluation
+
+Writes report.json (summary and per-image records), results.csv and, when
+matplotlib is installed, error_vs_latency.png and error_by_backend.png.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image
+from benchmark.memory import peak_rss, reset_peak_rss
+from module.ui_rules.color import ColorModule
+from module.ui_rules.engines import ENGINES
+from .dataset import _labels
+from .paths import EVALUATE_DIR, LABELS_FILE
+
+ROLES = ("primary", "secondary", "accent")
+
+
+def _warmup_image():
+    pixels = np.random.default_rng(0).integers(0, 256, size=(32, 32, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _engine_backend(engine: str):
+    def predict(image_byte: bytes):
+        dominant_colors = ColorModule(image_byte, engine=engine).extract_dominant_colors()
+        dominant_colors = sorted(dominant_colors, key=lambda x: x[1], reverse=True)
+        colors = [list(color) for color, _ in dominant_colors[: len(ROLES)]]
+        # Images with fewer distinct colors repeat the last one (black if there is none)
+        return colors + [colors[-1] if colors else [0, 0, 0]] * (len(ROLES) - len(colors))
+
+    # Run once so that lazy imports (scikit-learn takes about a second) are not timed
+    # with the first image
+    predict(_warmup_image())
+    return predict
+
+
+def _cnn_backend():
+    # torch is optional for the evaluation, so import it only for the CNN
+    from .inference import BatchedPredictor
+
+    predictor = BatchedPredictor(max_batch_size=1, max_latency_ms=0)
+    predictor.start()
+
+    def predict(image_byte: bytes):
+        return [list(color) for color in predictor.predict(image_byte)]
+
+    return predict
+
+
+def load_backends(names, log=print):
+    """
+    Create the prediction function of every backend that can run here.
+    :param names: Backend names: "cnn" or a palette engine name.
+    :return: A dictionary of name -> function taking image bytes and returning 3 RGB colors.
+    """
+    backends = {}
+    for name in names:
+        try:
+            backends[name] = _cnn_backend() if name == "cnn" else _engine_backend(name)
+        except (ImportError, FileNotFoundError) as error:
+            log(f"Skipping {name}: {error}")
+    return backends
+
+
+def _measure(predict, image_byte: bytes):
+    reset_peak_rss()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        colors = predict(image_byte)
+    finally:
+        latency = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return colors, latency, peak, peak_rss()
+
+
+def evaluate(backends, img_dir: str = EVALUATE_DIR, csv_path: str | None = None, log=print):
+    """
+    Run every backend on every labelled image, reading each image once.
+    :param backends: A dictionary from load_backends.
+    :param img_dir: Directory with the images and "Result Data.json".
+    :param csv_path: Write one row per image and backend to this file as results arrive (optional).
+    :return: A list of per-image records; a backend that raised on an image gets a
+        record with its "error" instead of colors.
+    """
+    with open(os.path.join(img_dir, LABELS_FILE), "r") as f:
+        data = json.load(f)
+
+    csv_file = open(csv_path, "w", newline="") if csv_path else None
+    writer = None
+    if csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(
+            ["image", "backend", "latency_seconds", "alloc_peak_bytes", "peak_rss_bytes"]
+            + [f"{role}_error" for role in ROLES]
+            + ["error"]
+        )
+
+    records = []
+    try:
+        for i, item in enumerate(data):
+            with open(os.path.join(img_dir, item["name"]), "rb") as f:
+                image_byte = f.read()
+            expected = np.array(_labels(item), dtype=np.float64)
+            for name, predict in backends.items():
+                try:
+                    colors, latency, alloc_peak, rss = _measure(predict, image_byte)
+                except Exception as error:
+                    records.append({"image": item["name"], "backend": name, "error": repr(error)})
+                    if writer:
+                        writer.writerow([item["name"], name] + [""] * (3 + len(ROLES)) + [repr(error)])
+                    log(f"{name} failed on {item['name']}: {error!r}")
+                    continue
+                predicted = np.array(colors, dtype=np.float64)
+                # Euclidean distance in RGB units for each of primary, secondary and accent
+                errors = np.linalg.norm(predicted - expected, axis=1).tolist()
+                record = {
+                    "image": item["name"],
+                    "backend": name,
+                    "latency_seconds": latency,
+                    "alloc_peak_bytes": alloc_peak,
+                    "peak_rss_bytes": rss,
+                    "expected": expected.astype(int).tolist(),
+                    "predicted": predicted.astype(int).tolist(),
+                    "errors": errors,
+                }
+                records.append(record)
+                if writer:
+                    writer.writerow(
+                        [item["name"], name, latency, alloc_peak, rss] + errors + [""]
+                    )
+            if csv_file:
+                csv_file.flush()
+            log(f"[{i + 1}/{len(data)}] {item['name']}")
+    finally:
+        if csv_file:
+            csv_file.close()
+    return records
+
+
+def summarize(records):
+    """
+    Aggregate per-image records into per-backend color error, latency and memory.
+    Failed images are counted in "failures" and left out of every other figure.
+    """
+    summary = {}
+    for name in dict.fromkeys(record["backend"] for record in records):
+        failures = sum("error" in record for record in records if record["backend"] == name)
+        rows = [
+            record for record in records if record["backend"] == name and "error" not in record
+        ]
+        if not rows:
+            summary[name] = {"images": 0, "failures": failures}
+            continue
+        expected = np.array([row["expected"] for row in rows], dtype=np.float64) / 255
+        predicted = np.array([row["predicted"] for row in rows], dtype=np.float64) / 255
+        residual = predicted - expected
+        variance = ((expected - expected.mean(axis=0)) ** 2).sum()
+        latencies = sorted(row["latency_seconds"] for row in rows)
+        summary[name] = {
+            "images": len(rows),
+            "failures": failures,
+            "mse": float((residual**2).mean()),
+            "mae": float(np.abs(residual).mean()),
+            "r2": float(1 - (residual**2).sum() / variance) if variance else None,
+            **{
+                f"{role}_error_mean": statistics.fmean(row["errors"][i] for row in rows)
+                for i, role in enumerate(ROLES)
+            },
+            "latency_mean": statistics.fmean(latencies),
+            "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "alloc_peak_bytes_max": max(row["alloc_peak_bytes"] for row in rows),
+            "peak_rss_bytes_max": max(row["peak_rss_bytes"] or 0 for row in rows),
+        }
+    return summary
+
+
+def save_plots(records, summary, output_dir: str):
+    """
+    Save the accuracy-vs-latency plots as PNG files (skipped without matplotlib).
+    :return: The paths written.
+    """
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return []
+
+    summary = {name: stats for name, stats in summary.items() if stats["images"]}
+    paths = []
+    fig, ax = plt.subplots(figsize=(7, 5))
+    for name, stats in summary.items():
+        error = statistics.fmean(stats[f"{role}_error_mean"] for role in ROLES)
+        ax.scatter(stats["latency_mean"] * 1000, error, label=name)
+        ax.annotate(name, (stats["latency_mean"] * 1000, error))
+    ax.set_xscale("log")
+    ax.set_xlabel("Mean latency (ms)")
+    ax.set_ylabel("Mean RGB error")
+    ax.set_title("Accuracy vs latency")
+    fig.tight_layout()
+    paths.append(os.path.join(output_dir, "error_vs_latency.png"))
+    fig.savefig(paths[-1])
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(7, 5))
+    names = list(summary)
+    ax.boxplot(
+        [
+            [
+                statistics.fmean(r["errors"])
+                for r in records
+                if r["backend"] == name and "error" not in r
+            ]
+            for name in names
+        ]
+    )
+    ax.set_xticks(range(1, len(names) + 1), names)
+    ax.set_ylabel("RGB error per image")
+    ax.set_title("Color error by backend")
+    fig.tight_layout()
+    paths.append(os.path.join(output_dir, "error_by_backend.png"))
+    fig.savefig(paths[-1])
+    plt.close(fig)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", default=EVALUATE_DIR, help="Directory with the evaluation set.")
+    parser.add_argument("--backends", nargs="*", default=["cnn", *ENGINES], choices=["cnn", *ENGINES])
+    parser.add_argument("--output-dir", default="evaluation")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    backends = load_backends(args.backends)
+    if not backends:
+        print("No backend can run.", file=sys.stderr)
+        return 1
+
+    records = evaluate(backends, args.images, os.path.join(args.output_dir, "results.csv"))
+    summary = summarize(records)
+    with open(os.path.join(args.output_dir, "report.json"), "w") as f:
+        json.dump({"summary": summary, "records": records}, f, indent=2)
+    save_plots(records, summary, args.output_dir)
+
+    for name, stats in summary.items():
+        failures = f"  failed on {stats['failures']} images" if stats["failures"] else ""
+        if not stats["images"]:
+            print(f"{name:12s}{failures}")
+            continue
+        r2 = "n/a" if stats["r2"] is None else f"{stats['r2']:.3f}"
+        print(
+            f"{name:12s} mae {stats['mae']:.4f}  r2 {r2}  "
+            f"latency {stats['latency_mean'] * 1000:8.1f} ms  p95 {stats['latency_p95'] * 1000:8.1f} ms"
+            f"{failures}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Export a model for fast CPU inference and check the exports against the eager model.
+
+Run from the backend directory:
+    python -m machine_learning.export color_picker_cnn
+    python -m machine_learning.export color_picker_cnn --check --output parity.json
+
+Writes <name>.pt (TorchScript), <name>.int8.pt (TorchScript with int8 dynamic
+quantization of the linear layers) and <name>.onnx (when the onnx package is
+installed) next to the .pth weights in MODEL_DIR.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import torch
+import torch.nn as nn
+from PIL import Image
+from benchmark.memory import current_rss
+from .paths import EVALUATE_DIR, LABELS_FILE
+from .preprocess import transform
+from .runtime import RUNTIMES, artifact_path, load_runtime
+from .utils import get_model
+
+EXAMPLE_INPUT_SHAPE = (1, 3, 128, 128)
+
+
+def export_torchscript(model, path: str):
+    traced = torch.jit.trace(model, torch.randn(EXAMPLE_INPUT_SHAPE))
+    traced.save(path)
+    return path
+
+
+def export_quantized(model, path: str):
+    # fc1 (28,800 x 128) holds almost all weights, so int8 linear layers shrink the model ~4x
+    quantized = torch.ao.quantization.quantize_dynamic(
+        model, {nn.Linear}, dtype=torch.qint8
+    )
+    return export_torchscript(quantized, path)
+
+
+def export_onnx(model, path: str):
+    torch.onnx.export(
+        model,
+        (torch.randn(EXAMPLE_INPUT_SHAPE),),
+        path,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+    )
+    return path
+
+
+EXPORTERS = {
+    "torchscript": export_torchscript,
+    "torchscript-int8": export_quantized,
+    "onnx": export_onnx,
+}
+
+
+def export(model_name: str, runtimes=tuple(EXPORTERS), log=print):
+    """
+    Write the exported artifacts of a model.
+    :param model_name: Name of the model, e.g. "color_picker_cnn".
+    :param runtimes: Which exports to produce.
+    :return: A dictionary of runtime name -> artifact path.
+    """
+    model = get_model(model_name)
+    paths = {}
+    for runtime in runtimes:
+        path = artifact_path(model_name, runtime)
+        try:
+            EXPORTERS[runtime](model, path + ".tmp")
+        except ImportError as error:
+            log(f"Skipping {runtime}: {error}")
+            continue
+        # Rename into place so a running server never loads a half-written file
+        os.replace(path + ".tmp", path)
+        paths[runtime] = path
+        log(f"Exported {runtime} to {path} ({artifact_bytes(path) / 1e6:.1f} MB)")
+    return paths
+
+
+def artifact_bytes(path: str):
+    """
+    Size of an artifact on disk, including ONNX external weight data.
+    """
+    size = os.path.getsize(path)
+    if os.path.exists(path + ".data"):
+        size += os.path.getsize(path + ".data")
+    return size
+
+
+def load_evaluation_batch(image_dir: str = EVALUATE_DIR):
+    with open(os.path.join(image_dir, LABELS_FILE)) as f:
+        data = json.load(f)
+    images = [
+        transform(Image.open(os.path.join(image_dir, item["name"])).convert("RGB"))
+        for item in data
+    ]
+    return torch.stack(images)
+
+
+def _latency(model, batch, repeat: int):
+    times = []
+    with torch.inference_mode():
+        model(batch)  # warm up
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(batch)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def check_parity(model_name: str, image_dir: str = EVALUATE_DIR, repeat: int = 10):
+    """
+    Compare every available runtime with the eager model on the evaluation set.
+    :return: A dictionary of runtime name -> max/mean difference in RGB units,
+        latency for one image and for the whole set, artifact size and RSS growth on load.
+    """
+    batch = load_evaluation_batch(image_dir)
+    with torch.inference_mode():
+        reference = get_model(model_name)(batch)
+
+    report = {}
+    for runtime in RUNTIMES:
+        rss_before = current_rss()
+        try:
+            _, model = load_runtime(model_name, runtime)
+        except FileNotFoundError:
+            continue
+        rss_after = current_rss()
+        with torch.inference_mode():
+            output = model(batch)
+        difference = (output - reference).abs() * 255
+        path = artifact_path(model_name, runtime)
+        report[runtime] = {
+            "max_rgb_difference": float(difference.max()),
+            "mean_rgb_difference": float(difference.mean()),
+            "latency_single": _latency(model, batch[:1], repeat),
+            "latency_batch": _latency(model, batch, max(1, repeat // 5)),
+            "batch_size": len(batch),
+            "artifact_bytes": artifact_bytes(path),
+            "load_rss_bytes": (
+                rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            ),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("model_name", nargs="?", default="color_picker_cnn")
+    parser.add_argument("--formats", nargs="*", default=list(EXPORTERS), choices=list(EXPORTERS))
+    parser.add_argument("--check", action="store_true", help="Compare the exports with the eager model.")
+    parser.add_argument("--images", default=EVALUATE_DIR, help="Directory with the evaluation set.")
+    parser.add_argument("--tolerance", type=float, default=8.0, help="Allowed max difference in RGB units.")
+    parser.add_argument("--output", help="Write the parity report as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    export(args.model_name, args.formats)
+    if not args.check:
+        return 0
+
+    report = check_parity(args.model_name, args.images)
+    for runtime, stats in report.items():
+        print(
+            f"{runtime:18s} max diff {stats['max_rgb_difference']:6.2f}  "
+            f"mean diff {stats['mean_rgb_difference']:6.3f}  "
+            f"1 image {stats['latency_single'] * 1000:7.2f} ms  "
+            f"{stats['batch_size']} images {stats['latency_batch'] * 1000:8.1f} ms  "
+            f"size {stats['artifact_bytes'] / 1e6:6.1f} MB"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [r for r, s in report.items() if s["max_rgb_difference"] > args.tolerance]
+    for runtime in failed:
+        print(f"PARITY FAILED {runtime}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
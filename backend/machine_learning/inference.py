@@ -0,0 +1,150 @@
+import asyncio
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import torch
+from PIL import Image
+from .preprocess import transform
+from .runtime import load_runtime
+
+
+def validate_rgb_values(rgb_values):
+    """Ensure RGB values are within the valid range [0, 255]."""
+    return tuple(
+        tuple(max(0, min(255, int(channel))) for channel in color)
+        for color in rgb_values
+    )
+
+
+class BatchedPredictor:
+    def __init__(
+        self,
+        model_name: str = "color_picker_cnn",
+        max_batch_size: int = 16,
+        max_latency_ms: float = 5,
+        num_threads: int | None = None,
+        runtime: str | None = None,
+    ):
+        """
+        Serve a model from one background thread, batching concurrent requests.
+        A batch runs as soon as it holds max_batch_size images or the oldest image
+        has waited max_latency_ms.
+        :param model_name: Name passed to load_runtime.
+        :param max_batch_size: Largest number of images per forward pass.
+        :param max_latency_ms: Longest time an image waits for others to join its batch.
+        :param num_threads: Intra-op threads used by torch (default is torch's choice).
+        :param runtime: Force a runtime from runtime.RUNTIMES (default is the fastest available).
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.num_threads = num_threads
+        self.runtime = runtime
+        self._queue = queue.Queue()
+        self._thread = None
+        self._model = None
+        # Callers of predict and submit may race to start the batching thread
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Load the model and start the batching thread (called on first submit).
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            self.runtime, self._model = load_runtime(
+                self.model_name, self.runtime, self.num_threads
+            )
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.model_name}-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def submit(self, image):
+        """
+        Queue an image for prediction.
+        :param image: Image bytes or a PIL image.
+        :return: A Future resolving to three (R, G, B) tuples: primary, secondary and accent.
+        """
+        # Preprocess in the caller's thread so the batching thread only runs the model
+        return self._enqueue(self._preprocess(image))
+
+    def predict(self, image):
+        return self.submit(image).result()
+
+    async def predict_async(self, image):
+        """
+        Predict without blocking the event loop; decoding runs in a thread.
+        """
+        tensor = await asyncio.to_thread(self._preprocess, image)
+        return await asyncio.wrap_future(self._enqueue(tensor))
+
+    @staticmethod
+    def _preprocess(image):
+        if isinstance(image, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(image))
+        return transform(image.convert("RGB"))
+
+    def _enqueue(self, tensor):
+        self.start()
+        future = Future()
+        self._queue.put((tensor, future))
+        return future
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Skip requests whose caller already gave up
+            batch = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            tensors = [tensor for tensor, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                with torch.inference_mode():
+                    outputs = self._model(torch.stack(tensors))
+            except Exception as error:
+                for future in futures:
+                    future.set_exception(error)
+                continue
+
+            # Convert output to RGB values
+            outputs = (outputs.numpy() * 255).astype(int)
+            for future, output in zip(futures, outputs):
+                future.set_result(validate_rgb_values(output))
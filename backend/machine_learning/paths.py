@@ -0,0 +1,15 @@
+import os
+
+# Annotated screenshots collected with the prepare_data tool
+DATA_DIR = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "..",
+    "archive",
+    "28-01-25",
+    "machine_learning",
+    "dominant_color_picker",
+)
+TRAIN_DIR = os.path.join(DATA_DIR, "train images")
+EVALUATE_DIR = os.path.join(DATA_DIR, "evaluate images")
+LABELS_FILE = "Result Data.json"
@@ -0,0 +1,98 @@
+import os
+import torch
+from .utils.get_model import MODEL_DIR, get_model
+
+# Fastest first; "eager" (the .pth state dict) is always the fallback
+RUNTIMES = ("onnx", "torchscript-int8", "torchscript", "eager")
+
+_SUFFIXES = {
+    "onnx": ".onnx",
+    "torchscript-int8": ".int8.pt",
+    "torchscript": ".pt",
+    "eager": ".pth",
+}
+
+
+def artifact_path(model_name: str, runtime: str):
+    """
+    Path of the artifact a runtime loads.
+    :param model_name: Name of the model, e.g. "color_picker_cnn".
+    :param runtime: One of RUNTIMES.
+    """
+    return os.path.join(MODEL_DIR, model_name + _SUFFIXES[runtime])
+
+
+class OnnxModel:
+    def __init__(self, path: str, num_threads: int | None = None):
+        """
+        Run an exported ONNX model with onnxruntime, taking and returning torch tensors.
+        :param path: Path to the .onnx file.
+        :param num_threads: Intra-op threads (default is onnxruntime's choice).
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        output = self.session.run(None, {self.input_name: batch.numpy()})[0]
+        return torch.from_numpy(output)
+
+
+def _stale(path: str, weights: str):
+    """
+    :return: True if the weights were saved after the artifact was exported from them,
+        i.e. the model was retrained since the last export.
+    """
+    try:
+        return os.stat(path).st_mtime < os.stat(weights).st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _available(runtime: str, path: str, weights: str):
+    if runtime == "eager":
+        return True
+    if not os.path.exists(path) or _stale(path, weights):
+        return False
+    if runtime == "onnx":
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+def load_runtime(model_name: str, runtime: str | None = None, num_threads: int | None = None):
+    """
+    Load the fastest available artifact of a model. Artifacts older than the .pth
+    weights were exported before the last training run and are skipped; run
+    machine_learning.export again to use them.
+    :param model_name: Name of the model, e.g. "color_picker_cnn".
+    :param runtime: Force one of RUNTIMES instead of picking the fastest (optional).
+    :param num_threads: Intra-op threads for onnxruntime (optional).
+    :return: A tuple (runtime name, callable taking a batch tensor and returning the output).
+    """
+    if runtime is not None and runtime not in RUNTIMES:
+        raise ValueError(f"Unknown runtime: {runtime}")
+
+    weights = artifact_path(model_name, "eager")
+    for candidate in [runtime] if runtime else RUNTIMES:
+        path = artifact_path(model_name, candidate)
+        if not _available(candidate, path, weights):
+            continue
+        if candidate == "onnx":
+            return candidate, OnnxModel(path, num_threads)
+        if candidate == "eager":
+            get_model(model_name)
+            # Look the model up per batch so weight files swapped on disk are picked up
+            return candidate, lambda batch: get_model(model_name)(batch)
+        model = torch.jit.load(path, map_location="cpu")
+        model.eval()
+        return candidate, model
+    raise FileNotFoundError(f"No up-to-date {runtime} artifact for {model_name} in {MODEL_DIR}")
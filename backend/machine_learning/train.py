@@ -0,0 +1,92 @@
+"""
+Train ColorPickerCNN on the annotated screenshots.
+
+Run from the backend directory:
+    python -m machine_learning.train --epochs 10
+"""
+
+import argparse
+import os
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from torch.utils.data import DataLoader
+from torchvision import transforms
+from .dataset import ShardDataset, build_shard, shard_exists
+from .model import ColorPickerCNN
+from .paths import TRAIN_DIR
+from .preprocess import transform
+from .utils.get_model import MODEL_DIR
+
+SHARD_DIR = os.path.join(os.path.dirname(__file__), "cache")
+
+
+def trainer(loop=10, img_dir=TRAIN_DIR, shard_dir=None, model_name="color_picker_cnn"):
+    # Decode the training set once; every epoch then reads the memory-mapped shard
+    shard_dir = shard_dir or os.path.join(SHARD_DIR, os.path.basename(os.path.normpath(img_dir)))
+    if not shard_exists(shard_dir, img_dir):
+        build_shard(img_dir, shard_dir)
+
+    # Data augmentation and normalization for training
+    data_transforms = transforms.Compose(
+        [
+            transforms.RandomResizedCrop(128),
+            transforms.RandomHorizontalFlip(),
+            transform,  # Existing transformations
+        ]
+    )
+
+    # Load dataset
+    dataset = ShardDataset(shard_dir, transform=data_transforms)
+    dataloader = DataLoader(dataset, batch_size=32, shuffle=True, num_workers=4)
+
+    # Initialize model, loss function, and optimizer
+    model = ColorPickerCNN()
+    criterion = nn.MSELoss()
+    optimizer = optim.Adam(model.parameters(), lr=0.0001)  # Lower learning rate
+    scheduler = optim.lr_scheduler.StepLR(optimizer, step_size=7, gamma=0.1)
+
+    # Training loop
+    for epoch in range(loop):  # Number of epochs
+        model.train()
+        running_loss = 0.0
+        for images, labels in dataloader:
+            optimizer.zero_grad()
+            outputs = model(images)
+            loss = criterion(outputs, labels)
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.item() * images.size(0)
+
+        # Step the learning rate scheduler
+        scheduler.step()
+
+        epoch_loss = running_loss / len(dataset)
+        print(f"Epoch {epoch+1}/{loop}, Loss: {epoch_loss:.4f}")
+
+    # Save the trained model
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    # Rename into place so a served model never reads a half-written file
+    path = os.path.join(MODEL_DIR, f"{model_name}.pth")
+    torch.save(model.state_dict(), path + ".tmp")
+    os.replace(path + ".tmp", path)
+    print("Training complete")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--images", default=TRAIN_DIR, help="Directory with the training set.")
+    parser.add_argument("--shard", default=None, help="Directory of the decoded image cache.")
+    parser.add_argument("--rebuild", action="store_true", help="Decode the images again.")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        shard_dir = args.shard or os.path.join(SHARD_DIR, os.path.basename(os.path.normpath(args.images)))
+        build_shard(args.images, shard_dir)
+        args.shard = shard_dir
+    trainer(args.epochs, args.images, args.shard)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .get_model import ModelRegistry, get_model, registry
+
+__all__ = ["ModelRegistry", "get_model", "registry"]
@@ -1,2 +1,172 @@
-def get_model(model_name: str):
-    return model_name
+import os
+import threading
+import time
+from collections import OrderedDict
+import torch
+from machine_learning.model import ColorPickerCNN
+from settings import settings
+
+MODEL_DIR = settings.model_dir
+
+
+def _model_bytes(model):
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def _load_state_dict(path: str):
+    try:
+        # Memory-map the weights so workers share the file's pages instead of copying them.
+        # The loaded model reads the file directly, so weight files must only ever be
+        # replaced with os.replace (as train.py does), never rewritten in place: a
+        # replaced file keeps its pages until the old model is unloaded.
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True), True
+    except (TypeError, RuntimeError):
+        # Older torch, or a file saved in the legacy (non-zip) format
+        return torch.load(path, map_location="cpu"), False
+
+
+class _Entry:
+    def __init__(self, factory, path: str):
+        self.factory = factory
+        self.path = path
+        self.model = None
+        self.signature = None
+        self.bytes = 0
+        self.checked_at = 0.0
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget: int | None = None, reload_interval: float = 2.0):
+        """
+        Map model names and versions to weight files, loading them on first use.
+        :param memory_budget: Bytes of weights kept loaded; least recently used models
+            are unloaded past it (default is no limit).
+        :param reload_interval: Seconds between checks for changed weight files (0 checks every call).
+        """
+        self.memory_budget = memory_budget
+        self.reload_interval = reload_interval
+        self._entries = {}
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_name: str, version: str | None):
+        return model_name if version is None else f"{model_name}-{version}"
+
+    def register(self, model_name: str, factory, version: str | None = None, path: str | None = None):
+        """
+        Register a model.
+        :param model_name: Name of the model, e.g. "color_picker_cnn".
+        :param factory: Callable creating the untrained model.
+        :param version: Version label (optional).
+        :param path: Weight file (default is MODEL_DIR/<name>.pth or MODEL_DIR/<name>-<version>.pth).
+        """
+        key = self._key(model_name, version)
+        path = path or os.path.join(MODEL_DIR, f"{key}.pth")
+        with self._lock:
+            self._entries[key] = _Entry(factory, path)
+
+    def _signature(self, path: str):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, entry: _Entry):
+        state_dict, mapped = _load_state_dict(entry.path)
+        model = entry.factory()
+        if mapped:
+            model.load_state_dict(state_dict, assign=True)
+        else:
+            model.load_state_dict(state_dict)
+        model.eval()
+        return model
+
+    def _evict(self, keep: str):
+        if self.memory_budget is None:
+            return
+        total = sum(self._entries[key].bytes for key in self._loaded)
+        for key in list(self._loaded):
+            if total <= self.memory_budget:
+                break
+            if key == keep:
+                continue
+            entry = self._entries[key]
+            total -= entry.bytes
+            entry.model = None
+            entry.signature = None
+            del self._loaded[key]
+
+    def get(self, model_name: str, version: str | None = None):
+        """
+        Return the model, loading it on first use and reloading it when its file changed.
+        :raises KeyError: If the model is not registered.
+        """
+        key = self._key(model_name, version)
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(f"Unknown model: {key}")
+            entry = self._entries[key]
+            model = entry.model
+            now = time.monotonic()
+            if model is not None and now - entry.checked_at < self.reload_interval:
+                self._loaded.move_to_end(key)
+                return model
+            entry.checked_at = now
+
+        try:
+            signature = self._signature(entry.path)
+        except FileNotFoundError:
+            if model is None:
+                raise
+            # The file is being replaced or was removed; keep serving the loaded model
+            signature = entry.signature
+        if model is not None and signature == entry.signature:
+            with self._lock:
+                if key in self._loaded:
+                    self._loaded.move_to_end(key)
+            return model
+
+        # Load outside the lock so other models stay available, then swap in atomically;
+        # callers holding the old model keep using it until they ask again
+        model = self._load(entry)
+        with self._lock:
+            entry.model = model
+            entry.signature = signature
+            entry.bytes = _model_bytes(model)
+            self._loaded[key] = True
+            self._loaded.move_to_end(key)
+            self._evict(keep=key)
+        return model
+
+    def unload(self, model_name: str, version: str | None = None):
+        key = self._key(model_name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.model = None
+                entry.signature = None
+            self._loaded.pop(key, None)
+
+    def loaded(self):
+        """
+        Names of the loaded models, least recently used first, with their size in bytes.
+        """
+        with self._lock:
+            return {key: self._entries[key].bytes for key in self._loaded}
+
+
+registry = ModelRegistry(
+    memory_budget=settings.model_memory_budget,
+    reload_interval=settings.model_reload_interval,
+)
+registry.register("color_picker_cnn", ColorPickerCNN)
+
+
+def get_model(model_name: str, version: str | None = None):
+    """
+    Return a model from the default registry, loading its weights on first use.
+    :param model_name: Name of the model, e.g. "color_picker_cnn".
+    :param version: Version label (optional).
+    :return: The model in eval mode.
+    """
+    return registry.get(model_name, version)
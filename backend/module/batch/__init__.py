@@ -0,0 +1,4 @@
+from .archive import is_zip, zip_members
+from .stream import as_completed_bounded
+
+__all__ = ["as_completed_bounded", "is_zip", "zip_members"]
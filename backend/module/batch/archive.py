@@ -0,0 +1,35 @@
+import os
+import zipfile
+
+_ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+
+
+def is_zip(file) -> bool:
+    """
+    Check whether a file object holds a zip archive, without moving its position.
+    :param file: A seekable binary file object.
+    """
+    position = file.tell()
+    try:
+        return file.read(4) in _ZIP_MAGIC
+    finally:
+        file.seek(position)
+
+
+def zip_members(archive: zipfile.ZipFile):
+    """
+    List the files of an archive worth analysing, skipping directories and metadata
+    such as __MACOSX/ or dot files.
+    :return: A list of ZipInfo in archive order.
+    """
+    members = []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        parts = info.filename.split("/")
+        if parts[0] == "__MACOSX" or any(part.startswith(".") for part in parts):
+            continue
+        if not os.path.basename(info.filename):
+            continue
+        members.append(info)
+    return members
@@ -0,0 +1,33 @@
+import asyncio
+
+
+async def as_completed_bounded(items, worker, concurrency: int):
+    """
+    Run worker(item) for every item with at most `concurrency` running at once and yield
+    the results in completion order.
+
+    Items are pulled only when a slot is free, so a large batch never holds more than
+    `concurrency` items in memory.
+    :param items: An async iterable of items.
+    :param worker: Coroutine function taking one item.
+    :param concurrency: Maximum number of workers running at once.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    pending = set()
+    try:
+        async for item in items:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.create_task(worker(item)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # The consumer went away (e.g. the client disconnected): stop the remaining work.
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,4 @@
+from .analysis_options import build_color_options, result_key
+from .result_cache import ResultCache, cache_key
+
+__all__ = ["ResultCache", "build_color_options", "cache_key", "result_key"]
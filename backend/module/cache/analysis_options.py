@@ -0,0 +1,46 @@
+from .result_cache import cache_key
+
+
+def build_color_options(
+    info,
+    engine: str = "kmeans",
+    sample: str | None = None,
+    sample_size: int = 100_000,
+    decode_max_pixels: int | None = None,
+    memory_budget: int | None = None,
+):
+    """
+    Build the ColorModule options for an image. The API and the audit both use them, so
+    the same image and settings give the same result key.
+    :param info: ImageInfo of the image.
+    :param engine: Name of a registered color engine.
+    :param sample: Sampling strategy, or None to cluster every pixel.
+    :param sample_size: Number of pixels to sample.
+    :param decode_max_pixels: Images above this pixel count are decoded at a reduced scale.
+    :param memory_budget: Bytes one analysis may allocate, or None for no budget.
+    :return: A dictionary of options for analyze_60_30_10.
+    :raises ImageValidationError: 413 if decoding the image would exceed the memory budget.
+    """
+    options = {"num_colors": 3, "engine": engine}
+    if decode_max_pixels and info.pixels > decode_max_pixels:
+        options["max_pixels"] = decode_max_pixels
+    if memory_budget:
+        # Only JPEG is decoded at a reduced scale; other formats are decoded in full first
+        if not info.draftable and info.decode_bytes > memory_budget:
+            # Pillow is loaded by now, since info was read from the image header
+            from module.validation import ImageValidationError
+
+            raise ImageValidationError(
+                "Image is too large to decode within the memory budget.", status_code=413
+            )
+        options["memory_budget"] = memory_budget
+    if sample is not None:
+        options.update(sample=sample, sample_size=sample_size, seed=0)
+    return options
+
+
+def result_key(image_byte: bytes, acceptable_range: float, color_options: dict):
+    """
+    :return: The result cache key of an analysis of image_byte with these options.
+    """
+    return cache_key(image_byte, {"acceptable_range": acceptable_range, **color_options})
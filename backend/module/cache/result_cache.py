@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def cache_key(image_byte: bytes, params: dict) -> str:
+    """
+    Build a content-addressed cache key.
+    :param image_byte: Bytes of the image file.
+    :param params: Analysis parameters that change the result.
+    :return: Hex digest identifying the image and parameters.
+    """
+    digest = hashlib.sha256(image_byte)
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        directory: str | None = None,
+        max_disk_bytes: int = 1024**3,
+    ):
+        """
+        LRU cache of analysis results with an optional on-disk tier.
+        :param max_entries: Maximum number of results kept in memory.
+        :param directory: Directory for results that survive restarts (optional).
+        :param max_disk_bytes: Size of the on-disk tier; the least recently used results
+            are deleted beyond it (default is 1 GiB).
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative")
+        if max_disk_bytes < 0:
+            raise ValueError("max_disk_bytes must not be negative")
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Size in bytes of every result on disk, least recently used first.
+        self._disk_entries = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_disk()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, value):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _scan_disk(self):
+        # Files written by earlier runs, oldest access first (hits touch the file's mtime)
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, name[: -len(".json")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk_entries[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        # Called with the lock held, or before the cache is shared
+        while self._disk_bytes > self.max_disk_bytes and self._disk_entries:
+            key, size = self._disk_entries.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _touch_disk(self, key: str):
+        with self._lock:
+            if key in self._disk_entries:
+                self._disk_entries.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial result.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._disk_bytes += size - self._disk_entries.pop(key, 0)
+            self._disk_entries[key] = size
+            self._evict_disk()
+
+    def get(self, key: str):
+        """
+        Look up a result.
+        :param key: Key returned by cache_key.
+        :return: The cached result, or None on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        if self.directory:
+            value = self._read_disk(key)
+            if value is not None:
+                self._touch_disk(key)
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        """
+        Store a JSON-serializable result.
+        :param key: Key returned by cache_key.
+        :param value: The result to store.
+        """
+        with self._lock:
+            self._remember(key, value)
+        if self.directory:
+            self._write_disk(key, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+            }
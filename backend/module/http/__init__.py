@@ -0,0 +1,3 @@
+from .upload_limit import UploadLimitMiddleware
+
+__all__ = ["UploadLimitMiddleware"]
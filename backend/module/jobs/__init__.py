@@ -0,0 +1,4 @@
+from .scheduler import JobQueueFullError, JobScheduler
+from .store import JOB_STATUSES, JobStore
+
+__all__ = ["JOB_STATUSES", "JobQueueFullError", "JobScheduler", "JobStore"]
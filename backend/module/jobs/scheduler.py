@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import sqlite3
+import time
+from collections import defaultdict
+from module.worker import PoolSaturatedError
+from .store import JobStore
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when a client already has the maximum number of queued jobs."""
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        store: JobStore,
+        runner,
+        max_running: int,
+        max_running_per_client: int = 2,
+        max_queued_per_client: int = 100,
+        retry_after: float = 1,
+        heartbeat_interval: float = 10,
+        stale_after: float = 60,
+        retention: float | None = None,
+        purge_interval: float = 3600,
+        poll_interval: float = 1,
+    ):
+        """
+        Run stored jobs in the background, by priority, with per-client concurrency limits.
+        Several processes may share the store: each job is claimed by one of them, and
+        every heartbeat_interval each process marks its running jobs as alive, queues
+        jobs left by processes that stopped and picks up jobs queued by the others.
+        :param store: Store holding the jobs.
+        :param runner: Coroutine function runner(image_byte, params) returning the result.
+        :param max_running: Number of jobs running at the same time.
+        :param max_running_per_client: Number of jobs one client may have running.
+        :param max_queued_per_client: Number of jobs one client may have waiting.
+        :param retry_after: Seconds to wait before retrying a job when the worker pool is full.
+        :param heartbeat_interval: Seconds between two maintenance rounds.
+        :param stale_after: Seconds without a heartbeat after which a running job is queued again.
+        :param retention: Seconds finished jobs are kept (default is forever).
+        :param purge_interval: Seconds between two deletions of old finished jobs.
+        :param poll_interval: Seconds between two store reads while long-polling a job
+            run by another process.
+        """
+        if max_running < 1 or max_running_per_client < 1:
+            raise ValueError("concurrency limits must be at least 1")
+        self.store = store
+        self.runner = runner
+        self.max_running = max_running
+        self.max_running_per_client = max_running_per_client
+        self.max_queued_per_client = max_queued_per_client
+        self.retry_after = retry_after
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.poll_interval = poll_interval
+        # Entries are (priority, sequence, job id, client); the queue is small, so picking
+        # the next job is a linear scan rather than a heap that would need re-keying.
+        self._queue = []
+        self._sequence = itertools.count()
+        self._queued = defaultdict(int)
+        self._running = defaultdict(int)
+        self._tasks = set()
+        # Ids of the jobs queued or running in this process
+        self._jobs = set()
+        self._finished = {}
+        self._waiters = defaultdict(int)
+        self._maintenance = None
+
+    @property
+    def queued(self):
+        return len(self._queue)
+
+    @property
+    def running(self):
+        return sum(self._running.values())
+
+    def start(self):
+        """
+        Queue the jobs left over from a previous run and start the maintenance rounds.
+        Jobs still marked as running are queued again once they are stale_after old.
+        """
+        self.store.recover(self.stale_after)
+        self._push_pending(self.store.pending())
+        self._dispatch()
+        self._maintenance = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        """
+        Cancel running jobs and put them back in the queue for the next start.
+        """
+        tasks = list(self._tasks)
+        if self._maintenance is not None:
+            tasks.append(self._maintenance)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue.clear()
+        self._queued.clear()
+        self._jobs.clear()
+
+    def submit(self, job_id: str, client: str, priority: int = 0):
+        """
+        Schedule a job already stored as queued.
+        """
+        self._push(job_id, client, priority)
+        self._dispatch()
+
+    def check_capacity(self, client: str):
+        """
+        :raises JobQueueFullError: If the client cannot queue another job.
+        """
+        if self._queued[client] >= self.max_queued_per_client:
+            raise JobQueueFullError(f"client {client!r} has too many queued jobs")
+
+    async def wait(self, job_id: str, timeout: float):
+        """
+        Wait until a job finishes or the timeout expires. Jobs that are not in this
+        process are run by another one, so the store is read every poll_interval.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] += 1
+        try:
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    await asyncio.wait_for(event.wait(), min(self.poll_interval, remaining))
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                if job_id not in self._jobs:
+                    status = await asyncio.to_thread(self.store.status, job_id)
+                    if status not in ("queued", "running"):
+                        return
+        finally:
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                self._finished.pop(job_id, None)
+
+    def _push(self, job_id: str, client: str, priority: int):
+        self._queue.append((priority, next(self._sequence), job_id, client))
+        self._queued[client] += 1
+        self._jobs.add(job_id)
+
+    def _push_pending(self, pending):
+        for job_id, client, priority in pending:
+            if job_id not in self._jobs:
+                self._push(job_id, client, priority)
+
+    async def _maintain(self):
+        last_purge = None
+        while True:
+            try:
+                now = time.monotonic()
+                if self.retention is not None and (
+                    last_purge is None or now - last_purge >= self.purge_interval
+                ):
+                    await asyncio.to_thread(self.store.purge, self.retention)
+                    last_purge = now
+                running = self._jobs.difference(entry[2] for entry in self._queue)
+                await asyncio.to_thread(self.store.heartbeat, running)
+                await asyncio.to_thread(self.store.recover, self.stale_after)
+                self._push_pending(await asyncio.to_thread(self.store.pending))
+                self._dispatch()
+            except sqlite3.Error:
+                # Another process may hold the database lock; try again next round
+                pass
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _next(self):
+        """
+        Pick the highest-priority job whose client is under its limit. Among equal
+        priorities the client with fewer running jobs goes first, then the oldest job.
+        """
+        best = None
+        for index, (priority, sequence, _, client) in enumerate(self._queue):
+            running = self._running[client]
+            if running >= self.max_running_per_client:
+                continue
+            rank = (-priority, running, sequence)
+            if best is None or rank < best[0]:
+                best = (rank, index)
+        return None if best is None else self._queue.pop(best[1])
+
+    def _dispatch(self):
+        while self.running < self.max_running:
+            entry = self._next()
+            if entry is None:
+                return
+            priority, _, job_id, client = entry
+            self._queued[client] -= 1
+            self._running[client] += 1
+            task = asyncio.create_task(self._execute(job_id, client, priority))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job_id: str, client: str, priority: int):
+        claimed = requeue = False
+        try:
+            claimed = await asyncio.to_thread(self.store.claim, job_id)
+            if claimed:
+                image_byte, params = await asyncio.to_thread(self.store.load, job_id)
+                result = await self.runner(image_byte, params)
+                await asyncio.to_thread(self.store.finish, job_id, result)
+        except PoolSaturatedError:
+            # Synchronous requests filled the worker pool; try again shortly.
+            await asyncio.to_thread(self.store.requeue, job_id)
+            requeue = True
+        except asyncio.CancelledError:
+            if claimed:
+                await asyncio.to_thread(self.store.requeue, job_id)
+            raise
+        except Exception as error:
+            await asyncio.to_thread(self.store.fail, job_id, str(error) or type(error).__name__)
+        finally:
+            self._running[client] -= 1
+            if not requeue:
+                self._jobs.discard(job_id)
+
+        # An unclaimed job is run by another process sharing the store
+        if requeue:
+            await asyncio.sleep(self.retry_after)
+            self._push(job_id, client, priority)
+        elif claimed:
+            event = self._finished.pop(job_id, None)
+            if event is not None:
+                event.set()
+        self._dispatch()
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    image BLOB,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+)
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = ":memory:"):
+        """
+        SQLite store for analysis jobs, their uploads and their results.
+        :param path: Database file, or ":memory:" for a store that does not survive restarts.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(_SCHEMA)
+            columns = [row["name"] for row in self._connection.execute("PRAGMA table_info(jobs)")]
+            if "heartbeat_at" not in columns:
+                # Databases created before running jobs sent heartbeats
+                self._connection.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, sql: str, args=()):
+        with self._lock, self._connection:
+            return self._connection.execute(sql, args).fetchall()
+
+    def create(self, image_byte: bytes, params: dict, client: str, priority: int = 0):
+        """
+        Store a new queued job.
+        :param image_byte: Bytes of the uploaded image, kept until the job finishes.
+        :param params: JSON-serialisable analysis parameters.
+        :param client: Identifier of the submitting client.
+        :param priority: Higher priorities run first.
+        :return: The job id.
+        """
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, client, priority, status, params, image, created_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, client, priority, json.dumps(params), image_byte, time.time()),
+        )
+        return job_id
+
+    def get(self, job_id: str):
+        """
+        :return: The public view of a job (without its upload), or None if it is unknown.
+        """
+        rows = self._execute(
+            "SELECT id, priority, status, result, error, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        )
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def load(self, job_id: str):
+        """
+        :return: A tuple (image bytes, params) needed to run the job.
+        """
+        image_byte, params = self._execute(
+            "SELECT image, params FROM jobs WHERE id = ?", (job_id,)
+        )[0]
+        return image_byte, json.loads(params)
+
+    def status(self, job_id: str):
+        """
+        :return: The status of a job, or None if it is unknown.
+        """
+        rows = self._execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        return rows[0][0] if rows else None
+
+    def claim(self, job_id: str):
+        """
+        Mark a queued job as running. Processes sharing the database may try to run the
+        same job; only one of them gets it.
+        :return: True if the job was queued and is now claimed by the caller.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (now, now, job_id),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_ids):
+        """
+        Record that running jobs are still being worked on, so they are not recovered.
+        """
+        job_ids = list(job_ids)
+        if job_ids:
+            self._execute(
+                f"UPDATE jobs SET heartbeat_at = ? "
+                f"WHERE status = 'running' AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time(), *job_ids),
+            )
+
+    def requeue(self, job_id: str):
+        self._execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (job_id,),
+        )
+
+    def finish(self, job_id: str, result):
+        # The upload is no longer needed once the result is stored.
+        self._execute(
+            "UPDATE jobs SET status = 'done', result = ?, image = NULL, finished_at = ? "
+            "WHERE id = ?",
+            (json.dumps(result), time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = 'failed', error = ?, image = NULL, finished_at = ? "
+            "WHERE id = ?",
+            (error, time.time(), job_id),
+        )
+
+    def recover(self, stale_after: float):
+        """
+        Move running jobs whose process stopped sending heartbeats back to the queue.
+        :param stale_after: Seconds without a heartbeat after which a job is recovered.
+        :return: Number of recovered jobs.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (time.time() - stale_after,),
+            )
+            return cursor.rowcount
+
+    def pending(self):
+        """
+        :return: (job id, client, priority) of every queued job, oldest first.
+        """
+        rows = self._execute(
+            "SELECT id, client, priority FROM jobs WHERE status = 'queued' ORDER BY created_at"
+        )
+        return [tuple(row) for row in rows]
+
+    def purge(self, older_than: float):
+        """
+        Delete finished jobs.
+        :param older_than: Age in seconds after which finished jobs are deleted.
+        :return: Number of deleted jobs.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
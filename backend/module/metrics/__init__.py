@@ -0,0 +1,13 @@
+from .prometheus import Counter, Gauge, Histogram, Registry
+from .timing import NULL_TIMER, NullTimer, StageTimer, server_timing
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "NULL_TIMER",
+    "NullTimer",
+    "StageTimer",
+    "server_timing",
+]
@@ -0,0 +1,130 @@
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, function=None):
+        """
+        :param function: Called at scrape time to read the value (optional).
+        """
+        super().__init__(name, documentation)
+        self._values = {}
+        self._function = function
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        if self._function:
+            return self.header() + [f"{self.name} {self._function()}"]
+        with self._lock:
+            values = dict(self._values) or {(): 0}
+        return self.header() + [
+            f"{self.name}{_format_labels(labels)} {value}" for labels, value in values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function=None):
+        """
+        :param function: Called at scrape time to read the value (optional).
+        """
+        super().__init__(name, documentation)
+        self._value = 0
+        self._function = function
+
+    def set(self, value: float):
+        self._value = value
+
+    def render(self):
+        value = self._function() if self._function else self._value
+        return self.header() + [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            series = {key: (list(b), c, s) for key, (b, c, s) in self._series.items()}
+        for labels, (bucket_counts, count, total) in series.items():
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                le = labels + (("le", bound),)
+                lines.append(f"{self.name}_bucket{_format_labels(le)} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        """
+        Collection of metrics rendered in the Prometheus text format.
+        """
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, function=None):
+        return self.register(Counter(name, documentation, function))
+
+    def gauge(self, name: str, documentation: str, function=None):
+        return self.register(Gauge(name, documentation, function))
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,21 @@
+from .prometheus import Registry
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "analysis_request_seconds", "Latency of 60-30-10 requests in seconds."
+)
+queue_wait_seconds = registry.histogram(
+    "analysis_queue_wait_seconds", "Time an analysis waited for a free worker in seconds."
+)
+stage_seconds = registry.histogram(
+    "analysis_stage_seconds", "Duration of each analysis stage in seconds."
+)
+image_megapixels = registry.histogram(
+    "analysis_image_megapixels",
+    "Size of analyzed images in megapixels.",
+    buckets=(0.5, 1, 2, 4, 8, 16, 33, 50, 100),
+)
+rejected_total = registry.counter(
+    "analysis_rejected_total", "Requests rejected because the analysis pool was saturated."
+)
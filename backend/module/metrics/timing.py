@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    def __init__(self):
+        """
+        Record how long each stage of an analysis takes.
+        """
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        """
+        Time the body of a with-block.
+        :param name: Stage name, e.g. "decode".
+        :param info: Input sizes or other details to report with the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.stages.append(
+                {"name": name, "seconds": time.perf_counter() - start, **info}
+            )
+
+    def to_list(self):
+        return list(self.stages)
+
+
+class NullTimer:
+    """Timer used when instrumentation is disabled; every stage is a no-op."""
+
+    def stage(self, name: str, **info):
+        # A fresh dict every time, since callers may add details to the yielded info
+        return nullcontext(info)
+
+    def to_list(self):
+        return []
+
+
+NULL_TIMER = NullTimer()
+
+
+def server_timing(stages, **extra_seconds):
+    """
+    Format stage durations as a Server-Timing header value.
+    :param stages: Stage dictionaries from StageTimer.to_list.
+    :param extra_seconds: Extra metrics in seconds, e.g. queue=0.01.
+    :return: The header value, e.g. "decode;dur=12.3, cluster;dur=40.1".
+    """
+    entries = [(stage["name"], stage["seconds"]) for stage in stages]
+    entries += list(extra_seconds.items())
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in entries)
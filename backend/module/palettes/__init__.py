@@ -0,0 +1,24 @@
+from .export import EXPORT_FORMATS, export_lines
+from .lab import delta_e, palette_vector, parse_hex, rgb_to_lab
+from .store import PaletteStore
+
+__all__ = [
+    "EXPORT_FORMATS",
+    "PaletteIndex",
+    "PaletteStore",
+    "delta_e",
+    "export_lines",
+    "palette_vector",
+    "parse_hex",
+    "rgb_to_lab",
+]
+
+
+def __getattr__(name: str):
+    # PaletteIndex needs numpy and scikit-learn; import it on first search so that
+    # storing results does not load them into the API process.
+    if name == "PaletteIndex":
+        from .index import PaletteIndex
+
+        return PaletteIndex
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
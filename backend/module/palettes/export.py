@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+from .lab import ROLES
+
+EXPORT_FORMATS = ("jsonl", "csv")
+CSV_FIELDS = ["id", "image_hash", "created_at", "rule_followed"] + [
+    f"{role}_{field}" for role in ROLES for field in ("color", "percentage")
+]
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def export_lines(records, format: str = "jsonl"):
+    """
+    Format palette records one line at a time, so exports can be streamed.
+    :param records: Iterable of records from PaletteStore.
+    :param format: "jsonl" or "csv".
+    :return: A generator of text lines.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    if format == "jsonl":
+        for record in records:
+            yield json.dumps(record) + "\n"
+        return
+
+    yield _csv_line(CSV_FIELDS)
+    for record in records:
+        result = record["result"]
+        row = [record["id"], record["image_hash"], record["created_at"], result["rule_followed"]]
+        for role in ROLES:
+            color = result[f"{role}_color"]
+            row.append("#{:02x}{:02x}{:02x}".format(*color["color"]))
+            row.append(color["percentage"])
+        yield _csv_line(row)
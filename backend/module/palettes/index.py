@@ -0,0 +1,152 @@
+import threading
+import numpy as np
+
+
+def _tree(points):
+    # scikit-learn is only needed once palettes are searched
+    from sklearn.neighbors import KDTree
+
+    return KDTree(points) if len(points) else None
+
+
+class PaletteIndex:
+    def __init__(self, store, min_pending: int = 1024, pending_ratio: float = 0.05):
+        """
+        KD-trees over the Lab coordinates of the stored palettes: one over the 9-D
+        (primary, secondary, accent) vectors for similar palettes and one over the primary
+        colors for ΔE range queries. Palettes added after a build are kept in a small
+        pending list scanned linearly, and the trees are rebuilt once it outgrows
+        max(min_pending, pending_ratio * indexed palettes), so queries stay logarithmic
+        while rebuilds are amortised over many inserts.
+        :param store: PaletteStore the index is loaded from.
+        """
+        self.store = store
+        self.min_pending = min_pending
+        self.pending_ratio = pending_ratio
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, 9))
+        self._palette_tree = None
+        self._primary_tree = None
+        self._pending_ids = []
+        self._pending = []
+        self._rebuilding = False
+        # Highest row id indexed, so refresh only reads the rows stored after it
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._ids) + len(self._pending_ids)
+
+    def load(self):
+        """
+        Build the trees from every palette in the store. Palettes may be added meanwhile.
+        """
+        ids, vectors = self.store.vectors()
+        ids = np.array(ids, dtype=np.int64)
+        vectors = np.array(vectors, dtype=np.float64).reshape(-1, 9)
+        palette_tree, primary_tree = _tree(vectors), _tree(vectors[:, :3])
+        last_id = ids[-1] if len(ids) else 0
+        with self._lock:
+            self._ids, self._vectors = ids, vectors
+            self._palette_tree, self._primary_tree = palette_tree, primary_tree
+            self._last_id = max(self._last_id, int(last_id))
+            # Keep palettes added while the store was being read
+            pending = [
+                (record_id, vector)
+                for record_id, vector in zip(self._pending_ids, self._pending)
+                if record_id > last_id
+            ]
+            self._pending_ids = [record_id for record_id, _ in pending]
+            self._pending = [vector for _, vector in pending]
+
+    def refresh(self):
+        """
+        Index the palettes stored since the last load or refresh, including those other
+        processes stored. Only the rows after the highest indexed id are read.
+        """
+        ids, vectors = self.store.vectors(after_id=self._last_id)
+        for record_id, vector in zip(ids, vectors):
+            self.add(record_id, vector)
+
+    def add(self, record_id: int, vector):
+        """
+        Index a palette stored after the last build. Palettes must be added in id order;
+        one already indexed, e.g. by a concurrent refresh, is ignored.
+        :param vector: Its 9 Lab coordinates, as returned by PaletteStore.add.
+        """
+        with self._lock:
+            if record_id <= self._last_id:
+                return
+            self._last_id = record_id
+            self._pending_ids.append(record_id)
+            self._pending.append(vector)
+            threshold = max(self.min_pending, self.pending_ratio * len(self._ids))
+            if self._rebuilding or len(self._pending) <= threshold:
+                return
+            self._rebuilding = True
+            count = len(self._pending)
+            ids = np.concatenate([self._ids, np.array(self._pending_ids[:count], dtype=np.int64)])
+            vectors = np.concatenate([self._vectors, np.array(self._pending[:count])])
+
+        # Build outside the lock so queries keep using the old trees meanwhile
+        try:
+            palette_tree, primary_tree = _tree(vectors), _tree(vectors[:, :3])
+            with self._lock:
+                self._ids, self._vectors = ids, vectors
+                self._palette_tree, self._primary_tree = palette_tree, primary_tree
+                del self._pending_ids[:count], self._pending[:count]
+        finally:
+            self._rebuilding = False
+
+    def _snapshot(self):
+        with self._lock:
+            pending = np.array(self._pending, dtype=np.float64).reshape(-1, 9)
+            return self._ids, self._palette_tree, self._primary_tree, list(self._pending_ids), pending
+
+    def similar(self, vector, limit: int = 10):
+        """
+        Find the palettes closest to a palette.
+        :param vector: 9 Lab coordinates of the primary, secondary and accent colors.
+        :param limit: Number of palettes to return.
+        :return: A list of (row id, distance) tuples, closest first; the distance is the
+            root of the summed squared ΔE of the three colors.
+        """
+        ids, palette_tree, _, pending_ids, pending = self._snapshot()
+        query = np.asarray(vector, dtype=np.float64).reshape(1, 9)
+        found_ids, distances = [], []
+        if palette_tree is not None:
+            tree_distances, indices = palette_tree.query(query, k=min(limit, len(ids)))
+            found_ids.extend(ids[indices[0]].tolist())
+            distances.extend(tree_distances[0].tolist())
+        if pending_ids:
+            found_ids.extend(pending_ids)
+            distances.extend(np.linalg.norm(pending - query, axis=1).tolist())
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [(found_ids[i], distances[i]) for i in order]
+
+    def within_primary(self, lab, delta_e: float, limit: int | None = None):
+        """
+        Find the palettes whose primary color is within delta_e of a color.
+        :param lab: L*a*b* coordinates of the color.
+        :param delta_e: Largest CIE76 difference.
+        :param limit: Number of palettes to return (default is all).
+        :return: A tuple (total, matches): the number of palettes within delta_e and a list
+            of (row id, ΔE) tuples, closest first.
+        """
+        ids, _, primary_tree, pending_ids, pending = self._snapshot()
+        query = np.asarray(lab, dtype=np.float64).reshape(1, 3)
+        found_ids, distances = [], []
+        if primary_tree is not None:
+            indices, tree_distances = primary_tree.query_radius(
+                query, r=delta_e, return_distance=True
+            )
+            found_ids.extend(ids[indices[0]].tolist())
+            distances.extend(tree_distances[0].tolist())
+        if pending_ids:
+            pending_distances = np.linalg.norm(pending[:, :3] - query, axis=1)
+            for record_id, distance in zip(pending_ids, pending_distances.tolist()):
+                if distance <= delta_e:
+                    found_ids.append(record_id)
+                    distances.append(distance)
+        order = np.argsort(distances, kind="stable")[:limit]
+        return len(found_ids), [(found_ids[i], distances[i]) for i in order]
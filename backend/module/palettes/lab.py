@@ -0,0 +1,69 @@
+import math
+
+ROLES = ("primary", "secondary", "accent")
+
+# sRGB (D65) to CIE XYZ, and the D65 reference white
+_RGB_TO_XYZ = (
+    (0.4124564, 0.3575761, 0.1804375),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339, 0.1191920, 0.9503041),
+)
+_WHITE = (0.95047, 1.0, 1.08883)
+_EPSILON = (6 / 29) ** 3
+
+
+def _linear(channel: float):
+    channel /= 255
+    if channel <= 0.04045:
+        return channel / 12.92
+    return ((channel + 0.055) / 1.055) ** 2.4
+
+
+def _f(t: float):
+    if t > _EPSILON:
+        return t ** (1 / 3)
+    return t / (3 * (6 / 29) ** 2) + 4 / 29
+
+
+def rgb_to_lab(color):
+    """
+    Convert an sRGB color to CIE L*a*b* (D65).
+    :param color: (r, g, b) with channels from 0 to 255.
+    :return: A tuple (L, a, b).
+    """
+    linear = [_linear(channel) for channel in color]
+    x, y, z = (
+        _f(sum(m * c for m, c in zip(row, linear)) / white)
+        for row, white in zip(_RGB_TO_XYZ, _WHITE)
+    )
+    return 116 * y - 16, 500 * (x - y), 200 * (y - z)
+
+
+def delta_e(lab1, lab2):
+    """
+    CIE76 color difference, the Euclidean distance in L*a*b*; about 2.3 is just noticeable.
+    """
+    return math.dist(lab1, lab2)
+
+
+def parse_hex(value: str):
+    """
+    Parse a "#rrggbb" (or "rrggbb") color.
+    :return: A tuple (r, g, b).
+    :raises ValueError: If value is not a six digit hex color.
+    """
+    digits = value[1:] if value.startswith("#") else value
+    if len(digits) != 6:
+        raise ValueError(f"Not a #rrggbb color: {value}")
+    return tuple(int(digits[i : i + 2], 16) for i in (0, 2, 4))
+
+
+def palette_vector(result: dict):
+    """
+    Lab coordinates of the primary, secondary and accent colors of a 60-30-10 result.
+    :param result: A result of UIRulesModule.check_60_30_10_rule.
+    :return: A tuple of 9 floats.
+    """
+    return tuple(
+        value for role in ROLES for value in rgb_to_lab(result[f"{role}_color"]["color"])
+    )
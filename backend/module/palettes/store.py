@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import threading
+import time
+from .lab import ROLES, palette_vector
+
+_LAB_COLUMNS = [f"{role}_{axis}" for role in ROLES for axis in ("l", "a", "b")]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS palettes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    image_hash TEXT NOT NULL,
+    rule_followed INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    {", ".join(f"{column} REAL NOT NULL" for column in _LAB_COLUMNS)}
+)
+"""
+
+
+_INSERT = (
+    f"INSERT OR IGNORE INTO palettes (key, image_hash, rule_followed, result, created_at, "
+    f"{', '.join(_LAB_COLUMNS)}) VALUES ({', '.join('?' * (5 + len(_LAB_COLUMNS)))})"
+)
+
+
+def _row(key: str, image_hash: str, result: dict, vector):
+    return (key, image_hash, int(result["rule_followed"]), json.dumps(result), time.time(), *vector)
+
+
+def _record(row):
+    return {
+        "id": row["key"],
+        "image_hash": row["image_hash"],
+        "created_at": row["created_at"],
+        "result": json.loads(row["result"]),
+    }
+
+
+class PaletteStore:
+    def __init__(self, path: str = ":memory:"):
+        """
+        SQLite store of analysed palettes: the image hash, the 60-30-10 result and the Lab
+        coordinates of its colors, indexed by PaletteIndex.
+        :param path: Database file, or ":memory:" for a store that does not survive restarts.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(_SCHEMA)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS palettes_image ON palettes (image_hash)"
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, sql: str, args=()):
+        with self._lock, self._connection:
+            return self._connection.execute(sql, args).fetchall()
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(*) FROM palettes")[0][0]
+
+    def add(self, key: str, image_hash: str, result: dict):
+        """
+        Store the result of an analysis; an analysis already stored is kept as is.
+        :param key: Analysis id (the result cache key).
+        :param image_hash: Hex digest of the image bytes.
+        :param result: A result of UIRulesModule.check_60_30_10_rule.
+        :return: A tuple (row id, Lab vector) for PaletteIndex.add, or None if the key
+            was already stored.
+        """
+        vector = palette_vector(result)
+        with self._lock, self._connection:
+            cursor = self._connection.execute(_INSERT, _row(key, image_hash, result, vector))
+            if cursor.rowcount == 0:
+                return None
+            return cursor.lastrowid, vector
+
+    def add_many(self, records):
+        """
+        Store many analyses in one transaction.
+        :param records: Iterable of (key, image hash, result) tuples.
+        """
+        rows = [
+            _row(key, image_hash, result, palette_vector(result))
+            for key, image_hash, result in records
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(_INSERT, rows)
+
+    def get(self, key: str):
+        """
+        :return: The record of an analysis, or None if it is not stored.
+        """
+        rows = self._execute("SELECT * FROM palettes WHERE key = ?", (key,))
+        return _record(rows[0]) if rows else None
+
+    def vectors(self, after_id: int = 0):
+        """
+        :param after_id: Only palettes with a larger row id, e.g. the last one indexed.
+        :return: A tuple (row ids, Lab vectors) of the stored palettes, in id order.
+        """
+        rows = self._execute(
+            f"SELECT id, {', '.join(_LAB_COLUMNS)} FROM palettes WHERE id > ? ORDER BY id",
+            (after_id,),
+        )
+        return [row[0] for row in rows], [tuple(row[1:]) for row in rows]
+
+    def get_many(self, ids: list[int]):
+        """
+        :return: The records with these row ids, in the same order.
+        """
+        records = {}
+        # SQLite limits the number of query parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            rows = self._execute(
+                f"SELECT * FROM palettes WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            records.update((row["id"], _record(row)) for row in rows)
+        return [records[row_id] for row_id in ids if row_id in records]
+
+    def iter_records(self, rule_followed: bool | None = None, chunk_size: int = 1000):
+        """
+        Yield every stored record in id order, reading chunk_size rows at a time so that
+        exports of the whole store neither hold the lock nor load it into memory.
+        :param rule_followed: Only records with this verdict (default is all).
+        """
+        condition = "" if rule_followed is None else f"AND rule_followed = {int(rule_followed)}"
+        last_id = 0
+        while True:
+            rows = self._execute(
+                f"SELECT * FROM palettes WHERE id > ? {condition} ORDER BY id LIMIT ?",
+                (last_id, chunk_size),
+            )
+            for row in rows:
+                yield _record(row)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]["id"]
@@ -1,3 +1,11 @@
-from .ui_rules import UIRulesModule
-
 __all__ = ["UIRulesModule"]
+
+
+def __getattr__(name: str):
+    # UIRulesModule pulls in OpenCV and scikit-learn; import it on first use so that
+    # light submodules (engines, sampling) can be loaded without them.
+    if name == "UIRulesModule":
+        from .ui_rules import UIRulesModule
+
+        return UIRulesModule
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
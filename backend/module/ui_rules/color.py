@@ -1,44 +1,152 @@
 import io
+import math
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
 from PIL import Image
+from module.metrics import NULL_TIMER
+from module.validation import ImageInfo, ImageValidationError
+from .engines import get_engine
+from .incremental import TILE_SIZE, ColorState, tile_hashes, tile_slices
+from .sampling import SAMPLING_STRATEGIES, percentage_error_bound, sample_pixels
+from .unique_colors import merge_color_counts, unique_colors
+
+# Peak bytes allocated per decoded pixel by the analysis, measured with
+# `python -m benchmark.color_pipeline --max-peak-ratio`, plus headroom for the decoder.
+# Clustering every pixel (weighted=False) costs far more than distinct colors. The
+# incremental path counts colors tile by tile and peaks lower (under 1 byte per pixel
+# on the repo screenshots, against about 6), so it shares the weighted limit.
+PEAK_BYTES_PER_PIXEL = 12
+UNWEIGHTED_PEAK_BYTES_PER_PIXEL = 64
 
 
 class ColorModule:
-    def __init__(self, image_byte: bytes, num_colors: int = 3):
+    def __init__(
+        self,
+        image_byte: bytes,
+        num_colors: int = 3,
+        sample: str | None = None,
+        sample_size: int = 100_000,
+        seed=None,
+        weighted: bool = True,
+        engine: str = "kmeans",
+        timer=None,
+        max_pixels: int | None = None,
+        tile_workers: int = 1,
+        tile_min_pixels: int = 8_000_000,
+        previous: ColorState | None = None,
+        incremental: bool = False,
+        memory_budget: int | None = None,
+        init=None,
+    ):
         """
         Initialize the ColorModule with the image bytes and the number of dominant colors to extract.
         :param image_byte: Bytes of the image file.
         :param num_colors: Number of dominant colors to extract (default is 3).
+        :param sample: Pixel sampling strategy, "uniform" or "stratified" (default is no sampling).
+        :param sample_size: Number of pixels to cluster when sampling (default is 100,000).
+        :param seed: Seed used when sampling and by randomised engines such as KMeans (optional).
+        :param weighted: Cluster distinct colors weighted by their pixel count instead of every pixel (default is True).
+        :param engine: Name of the palette engine, see engines.ENGINES (default is "kmeans").
+        :param timer: StageTimer recording the duration of each stage (optional).
+        :param max_pixels: Decode larger images at a reduced scale below this pixel count (optional).
+        :param tile_workers: Threads counting colors tile by tile on large images (default is 1, no tiling).
+        :param tile_min_pixels: Smallest image, in pixels, split into tiles (default is 8,000,000).
+        :param previous: ColorState of a previous revision of the image; only changed tiles are recounted (optional).
+        :param incremental: Keep per-tile color counts in self.state for the next revision (default is False).
+        :param memory_budget: Bytes the analysis may allocate; larger images are decoded at a reduced scale, and images other than JPEG whose full decode exceeds it are refused (optional).
+        :param init: Palette to start clustering from, e.g. the colors found on a thumbnail (optional).
         """
         if not isinstance(image_byte, (bytes, bytearray)):
             raise TypeError("image_byte must be a bytes-like object")
+        if sample is not None and sample not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {sample}")
         self.image_byte = image_byte
         self.num_colors = num_colors
-        self.image = self._load_image()
+        self.sample = sample
+        self.sample_size = sample_size
+        self.seed = seed
+        self.weighted = weighted
+        self.engine = get_engine(engine, seed=seed)
+        self.timer = timer or NULL_TIMER
+        self.max_pixels = max_pixels
+        self.tile_workers = tile_workers
+        self.tile_min_pixels = tile_min_pixels
+        self.previous = previous
+        self.incremental = incremental
+        self.memory_budget = memory_budget
+        self.init = init
+        self.state = None
+        # Largest drift of the percentages caused by sampling, see percentage_error_bound
+        self.error_bound = None
+        with self.timer.stage("decode", bytes=len(image_byte)) as info:
+            self.image = self._load_image()
+            info["pixels"] = self.image.shape[0] * self.image.shape[1]
 
     def _load_image(self):
         """
         Load the image from bytes and convert to RGB.
+        Images above max_pixels, or too large for the memory budget, are decoded at a
+        reduced scale to bound memory use.
         :return: A numpy array of the image's RGB pixels.
         """
-        image = Image.open(io.BytesIO(self.image_byte)).convert("RGB")
-        return np.array(image)
+        image = Image.open(io.BytesIO(self.image_byte))
+        max_pixels = self._pixel_limit(image)
+        if max_pixels and image.width * image.height > max_pixels:
+            # JPEG can be decoded directly at 1/2, 1/4 or 1/8 scale. Asking for the whole
+            # factor the image is reduced by lets the draft pick the smaller scale
+            # instead of decoding at twice the size and reducing that
+            factor = math.ceil(math.sqrt(image.width * image.height / max_pixels))
+            image.draft("RGB", (image.width // factor, image.height // factor))
+            if image.width * image.height > max_pixels:
+                # Pillow cannot reduce every mode, and reduces images with alpha through
+                # a premultiplied copy, so convert first
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+                factor = math.ceil(math.sqrt(image.width * image.height / max_pixels))
+                image = image.reduce(factor)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        # asarray wraps the bytes Pillow exports instead of copying them once more; the
+        # array is read-only, which suits the pipeline since no stage modifies the image
+        return np.asarray(image)
+
+    def _pixel_limit(self, image):
+        """
+        :param image: The opened PIL image; only its header has been read.
+        :return: Largest number of pixels to decode, or None for no limit.
+        :raises ImageValidationError: If the image cannot be decoded within the memory budget.
+        """
+        limits = [self.max_pixels] if self.max_pixels else []
+        if self.memory_budget:
+            if self.weighted or self.sample is not None:
+                per_pixel = PEAK_BYTES_PER_PIXEL
+            else:
+                per_pixel = UNWEIGHTED_PEAK_BYTES_PER_PIXEL
+            budget = self.memory_budget
+            info = ImageInfo(image.format, image.width, image.height, image.mode, 1)
+            if not info.draftable and info.pixels * per_pixel > budget:
+                # Only JPEG is decoded at a reduced scale. Other formats are decoded and
+                # converted in full before they are reduced, and the freed rasters are
+                # rarely reused by the analysis, so they count against the budget
+                if info.decode_bytes > budget:
+                    raise ImageValidationError(
+                        "Image is too large to decode within the memory budget.", status_code=413
+                    )
+                budget -= info.decode_bytes
+            limits.append(max(1, budget // per_pixel))
+        return min(limits) if limits else None
 
     def _remove_background(self, image):
         """
-        Remove the background color from the image.
+        Find the pixels that are not background. The image is neither copied nor modified.
         :param image: A numpy array of the image's RGB pixels.
-        :return: A numpy array of the image's RGB pixels without the background.
+        :return: A boolean numpy array (height, width), True for foreground pixels.
         """
-        # Convert image to grayscale and apply threshold to create a mask
+        # Convert image to grayscale and threshold it; this selects the same pixels as
+        # masking with cv2.bitwise_and and dropping black ones, without copying the image
         gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-
-        # Apply the mask to the image
-        image_no_bg = cv2.bitwise_and(image, image, mask=mask)
-        return image_no_bg
+        return gray > 1
 
     def extract_dominant_colors(self):
         """
@@ -48,23 +156,170 @@ class ColorModule:
         # Convert image bytes to a numpy array
         image = self.image
 
-        # Remove the background from the image
-        image_no_bg = self._remove_background(image)
+        # Cluster a fixed number of pixels so the cost does not grow with resolution
+        if self.sample is not None:
+            with self.timer.stage("sample", pixels=self.sample_size):
+                # Sample foreground pixels only, so that every sample counts towards the
+                # percentages and the error bound does not depend on the background
+                foreground = self._remove_background(image)
+                pixels = sample_pixels(
+                    image, self.sample, self.sample_size, self.seed, mask=foreground
+                )
+                if len(pixels) < np.count_nonzero(foreground):
+                    self.error_bound = percentage_error_bound(len(pixels), self.num_colors)
+                else:
+                    # Every foreground pixel was kept: the percentages are exact
+                    self.error_bound = 0.0
+                image = pixels.reshape(-1, 1, 3)
 
-        # Reshape the image to be a list of pixels
-        pixels = image_no_bg.reshape(-1, 3)
+        if self.sample is None and self.weighted and (self.incremental or self.previous):
+            return self._extract_incremental(image)
 
-        # Remove any fully transparent pixels
-        pixels = pixels[np.any(pixels != [0, 0, 0], axis=1)]
+        if self._use_tiles(image):
+            with self.timer.stage("filter", tiles=self.tile_workers) as info:
+                colors, weights = self._filter_tiles(image)
+                info["colors"] = len(colors)
+        else:
+            # Remove the background from the image
+            with self.timer.stage("remove_background"):
+                foreground = self._remove_background(image)
+
+            with self.timer.stage("filter") as info:
+                colors, weights = self._filter_pixels(image, foreground)
+                info["colors"] = len(colors)
+
+        with self.timer.stage("cluster", engine=self.engine.name):
+            return self._cluster(colors, weights, init=self.init)
+
+    def _filter_pixels(self, image, foreground):
+        """
+        Turn the foreground pixels of the image into the colors to cluster.
+        :param image: A numpy array of the image's RGB pixels.
+        :param foreground: Boolean mask from _remove_background.
+        :return: A tuple (colors, weights); weights is None when every pixel is kept.
+        """
+        # UI screenshots repeat a few colors many times, so cluster each distinct
+        # color once and weight it by its pixel count
+        if self.weighted:
+            return unique_colors(image, foreground)
+
+        # Copy out the foreground pixels only
+        return image[foreground], None
+
+    def _extract_incremental(self, image):
+        """
+        Extract the dominant colors from per-tile color counts. With a previous state, only
+        the tiles whose pixels changed are counted again and clustering starts from the
+        previous palette. The new state is kept in self.state.
+        :param image: A numpy array of the image's RGB pixels.
+        :return: A list of the dominant colors in the image.
+        """
+        previous = self.previous
+        if previous is not None and not previous.reusable_for(image, TILE_SIZE):
+            previous = None
+        tiles = tile_slices(image.shape[0], image.shape[1], TILE_SIZE)
 
-        # Use KMeans to find the dominant colors
-        kmeans = KMeans(n_clusters=self.num_colors)
-        kmeans.fit(pixels)
+        with self.timer.stage("hash", tiles=len(tiles)) as info:
+            hashes = tile_hashes(image, tiles)
+            if previous is not None:
+                changed = previous.changed_tiles(hashes)
+            else:
+                changed = list(range(len(tiles)))
+            info["changed"] = len(changed)
 
-        # Get the RGB values of the cluster centers and their counts
-        colors, counts = np.unique(kmeans.labels_, return_counts=True)
-        dominant_colors = [
-            (kmeans.cluster_centers_[i].astype(int).tolist(), counts[i])
-            for i in range(len(colors))
-        ]
+        with self.timer.stage("filter") as info:
+            counted = self._count_tiles(image, [tiles[index] for index in changed])
+            if previous is None:
+                partials = counted
+                colors, weights = merge_color_counts(partials)
+            else:
+                # Update the previous totals: add the new counts of the changed tiles and
+                # subtract their old counts, so the work follows the size of the edit.
+                partials = list(previous.partials)
+                removed = []
+                for index, partial in zip(changed, counted):
+                    old_colors, old_counts = partials[index]
+                    removed.append((old_colors, -old_counts))
+                    partials[index] = partial
+                colors, weights = merge_color_counts(
+                    [(previous.colors, previous.counts), *counted, *removed]
+                )
+                keep = weights > 0
+                colors, weights = colors[keep], weights[keep]
+            info["colors"] = len(colors)
+
+        if (
+            previous is not None
+            and not changed
+            and previous.engine == self.engine.name
+            and previous.num_colors == self.num_colors
+        ):
+            dominant_colors = previous.dominant_colors
+        else:
+            init = previous.palette if previous is not None else self.init
+            with self.timer.stage("cluster", engine=self.engine.name, warm_start=init is not None):
+                dominant_colors = self._cluster(colors, weights, init=init)
+
+        self.state = ColorState(
+            image.shape,
+            TILE_SIZE,
+            hashes,
+            partials,
+            colors,
+            weights,
+            self.engine.name,
+            self.num_colors,
+            dominant_colors,
+        )
         return dominant_colors
+
+    def _count_tiles(self, image, tiles):
+        """
+        Remove the background and count the distinct colors of every tile, in a thread pool
+        when tile_workers > 1. OpenCV and the NumPy sort release the GIL.
+        :param image: A numpy array of the image's RGB pixels.
+        :param tiles: A list of (row slice, column slice) tuples.
+        :return: A list of (colors, counts) tuples, one per tile.
+        """
+
+        def count(tile):
+            rows, cols = tile
+            pixels = image[rows, cols]
+            return self._filter_pixels(pixels, self._remove_background(pixels))
+
+        if self.tile_workers > 1 and len(tiles) > 1:
+            with ThreadPoolExecutor(max_workers=self.tile_workers) as executor:
+                return list(executor.map(count, tiles))
+        return [count(tile) for tile in tiles]
+
+    def _use_tiles(self, image):
+        return (
+            self.weighted
+            and self.tile_workers > 1
+            and image.shape[0] * image.shape[1] >= self.tile_min_pixels
+        )
+
+    def _filter_tiles(self, image):
+        """
+        Remove the background and count distinct colors per horizontal tile in a thread
+        pool, then merge the counts. OpenCV and the NumPy sort release the GIL, so the
+        tiles are processed in parallel. The result equals _filter_pixels on the whole image.
+        :param image: A numpy array of the image's RGB pixels.
+        :return: A tuple (colors, weights).
+        """
+        # A few tiles per thread even out tiles with many distinct colors;
+        # row bands are views, so splitting copies nothing.
+        bounds = np.linspace(0, image.shape[0], min(self.tile_workers * 4, image.shape[0]) + 1)
+        bounds = bounds.astype(int)
+        tiles = [(slice(start, stop), slice(None)) for start, stop in zip(bounds[:-1], bounds[1:])]
+        return merge_color_counts(self._count_tiles(image, tiles))
+
+    def _cluster(self, colors, weights=None, init=None):
+        """
+        Cluster the colors with the selected palette engine.
+        :param colors: A numpy array of RGB colors (n, 3).
+        :param weights: Number of pixels each color stands for (default is one each).
+        :param init: Palette to start from, e.g. the previous revision's (optional).
+        :return: A list of (color, count) tuples, one per non-empty cluster.
+        """
+        return self.engine.extract(colors, weights, self.num_colors, init=init)
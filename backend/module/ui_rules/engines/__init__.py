@@ -0,0 +1,50 @@
+from .base import EngineCost, PaletteEngine
+from .histogram import HistogramEngine, MedianCutEngine
+from .kmeans import KMeansEngine, MiniBatchKMeansEngine
+from .octree import OctreeEngine
+
+ENGINES = {
+    engine.name: engine
+    for engine in (
+        KMeansEngine,
+        MiniBatchKMeansEngine,
+        HistogramEngine,
+        MedianCutEngine,
+        OctreeEngine,
+    )
+}
+
+
+def register_engine(engine):
+    """
+    Make a PaletteEngine subclass selectable by its name.
+    :param engine: The engine class.
+    """
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name: str, seed=None):
+    """
+    Create the engine registered under name.
+    :param name: Engine name, e.g. "kmeans".
+    :param seed: Seed for engines that use randomness (optional).
+    :return: A PaletteEngine instance.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown palette engine: {name}")
+    return ENGINES[name](seed=seed)
+
+
+__all__ = [
+    "ENGINES",
+    "EngineCost",
+    "PaletteEngine",
+    "HistogramEngine",
+    "KMeansEngine",
+    "MedianCutEngine",
+    "MiniBatchKMeansEngine",
+    "OctreeEngine",
+    "get_engine",
+    "register_engine",
+]
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class EngineCost:
+    def __init__(
+        self,
+        relative_latency: float,
+        accuracy: str,
+        complexity: str,
+        deterministic: bool,
+    ):
+        """
+        Cost characteristics of a palette engine, used to pick an engine per request.
+        :param relative_latency: Typical latency relative to the "kmeans" engine (1.0).
+        :param accuracy: "high", "medium" or "low" agreement with the "kmeans" engine.
+        :param complexity: Time complexity in terms of n distinct colors and k clusters.
+        :param deterministic: Whether the same input always gives the same palette.
+        """
+        self.relative_latency = relative_latency
+        self.accuracy = accuracy
+        self.complexity = complexity
+        self.deterministic = deterministic
+
+    def to_dict(self):
+        return {
+            "relative_latency": self.relative_latency,
+            "accuracy": self.accuracy,
+            "complexity": self.complexity,
+            "deterministic": self.deterministic,
+        }
+
+
+class PaletteEngine:
+    """Base class for palette extraction engines used by ColorModule."""
+
+    name = None
+    cost = None
+    # Whether _extract accepts an initial palette to refine (see extract).
+    warm_start = False
+
+    def __init__(self, seed=None):
+        """
+        :param seed: Seed for engines that start from random colors, such as KMeans (optional).
+        """
+        self.seed = seed
+
+    def extract(self, colors, weights, num_colors: int, init=None):
+        """
+        Find the dominant colors.
+        :param colors: A numpy array of RGB colors (n, 3).
+        :param weights: Number of pixels each color stands for (n,), or None for one each.
+        :param num_colors: Number of dominant colors to extract.
+        :param init: Palette (num_colors, 3) to start from, e.g. the one found for a previous
+            revision of the image. Ignored by engines that do not refine a palette.
+        :return: A list of (color, count) tuples, one per non-empty cluster.
+        """
+        if weights is None:
+            weights = np.ones(len(colors), dtype=np.uint32)
+
+        # Fewer distinct colors than clusters: every color is its own cluster
+        if len(colors) <= num_colors:
+            return [
+                (color.astype(int).tolist(), count)
+                for color, count in zip(colors, weights)
+            ]
+        if init is not None and self.warm_start and len(init) == num_colors:
+            return self._extract(colors, weights, num_colors, init=np.asarray(init, dtype=np.float64))
+        return self._extract(colors, weights, num_colors)
+
+    def _extract(self, colors, weights, num_colors: int):
+        raise NotImplementedError
+
+
+def weighted_means(colors, weights, labels, num_groups: int):
+    """
+    Weighted mean color and total weight of every group.
+    :return: A tuple (means, totals) of shapes (num_groups, 3) and (num_groups,).
+    """
+    totals = np.bincount(labels, weights=weights, minlength=num_groups)
+    sums = np.stack(
+        [
+            np.bincount(labels, weights=weights * colors[:, channel], minlength=num_groups)
+            for channel in range(3)
+        ],
+        axis=1,
+    )
+    means = sums / np.maximum(totals, 1)[:, None]
+    return means, totals
+
+
+def assign_to_palette(colors, weights, palette):
+    """
+    Assign every color to its nearest palette entry and count the pixels per entry.
+    :param colors: A numpy array of RGB colors (n, 3).
+    :param weights: Number of pixels each color stands for (n,).
+    :param palette: A numpy array of RGB palette colors (k, 3).
+    :return: A list of (color, count) tuples, one per non-empty palette entry.
+    """
+    palette = np.asarray(palette, dtype=np.float32)
+    distances = (
+        (colors[:, None, :].astype(np.float32) - palette[None, :, :]) ** 2
+    ).sum(axis=2)
+    labels = distances.argmin(axis=1)
+    counts = np.bincount(labels, weights=weights, minlength=len(palette)).astype(
+        np.int64
+    )
+    return [
+        (palette[i].astype(int).tolist(), counts[i])
+        for i in range(len(palette))
+        if counts[i] > 0
+    ]
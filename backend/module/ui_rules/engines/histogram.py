@@ -0,0 +1,80 @@
+import numpy as np
+from .base import EngineCost, PaletteEngine, assign_to_palette, weighted_means
+
+
+class HistogramEngine(PaletteEngine):
+    """Pick the most populated cells of a 16x16x16 RGB histogram (as in color.v3)."""
+
+    name = "histogram"
+    cost = EngineCost(
+        relative_latency=0.05,
+        accuracy="medium",
+        complexity="O(n)",
+        deterministic=True,
+    )
+
+    def __init__(self, bins_per_channel: int = 16, seed=None):
+        super().__init__(seed)
+        self.bins_per_channel = bins_per_channel
+
+    def _extract(self, colors, weights, num_colors: int):
+        bins = self.bins_per_channel
+        cells = (colors.astype(np.int64) * bins) // 256
+        labels = (cells[:, 0] * bins + cells[:, 1]) * bins + cells[:, 2]
+        means, totals = weighted_means(colors, weights, labels, bins**3)
+
+        # Use the mean color of the top cells, then count every pixel towards its nearest cell
+        top = np.argsort(totals)[::-1][:num_colors]
+        top = top[totals[top] > 0]
+        return assign_to_palette(colors, weights, means[top])
+
+
+class MedianCutEngine(PaletteEngine):
+    """Split color boxes along their widest channel at the weighted median until there are k boxes."""
+
+    name = "mediancut"
+    cost = EngineCost(
+        relative_latency=0.05,
+        accuracy="medium",
+        complexity="O(n * log(n) * k)",
+        deterministic=True,
+    )
+
+    @staticmethod
+    def _split(colors, weights, box):
+        box_colors = colors[box]
+        ranges = box_colors.max(axis=0).astype(int) - box_colors.min(axis=0)
+        channel = int(np.argmax(ranges))
+        order = np.argsort(box_colors[:, channel], kind="stable")
+        cumulative = np.cumsum(weights[box][order])
+        middle = np.searchsorted(cumulative, cumulative[-1] / 2)
+        middle = int(np.clip(middle, 0, len(box) - 2)) + 1
+        return box[order[:middle]], box[order[middle:]]
+
+    def _extract(self, colors, weights, num_colors: int):
+        boxes = [np.arange(len(colors))]
+        while len(boxes) < num_colors:
+            # Split the box with the largest channel range times pixel count, so
+            # a few outlier pixels do not take a whole palette entry
+            scores = [
+                int((colors[box].max(axis=0).astype(int) - colors[box].min(axis=0)).max())
+                * float(weights[box].sum())
+                if len(box) > 1
+                else -1
+                for box in boxes
+            ]
+            widest = int(np.argmax(scores))
+            if scores[widest] <= 0:
+                break
+            boxes.extend(self._split(colors, weights, boxes.pop(widest)))
+
+        labels = np.empty(len(colors), dtype=np.int64)
+        for i, box in enumerate(boxes):
+            labels[box] = i
+        means, totals = weighted_means(colors, weights, labels, len(boxes))
+        counts = totals.astype(np.int64)
+        return [
+            (means[i].astype(int).tolist(), counts[i])
+            for i in range(len(boxes))
+            if counts[i] > 0
+        ]
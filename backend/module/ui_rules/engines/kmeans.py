@@ -0,0 +1,68 @@
+import numpy as np
+from .base import EngineCost, PaletteEngine
+
+
+class KMeansEngine(PaletteEngine):
+    """Full KMeans, the reference engine."""
+
+    name = "kmeans"
+    cost = EngineCost(
+        relative_latency=1.0,
+        accuracy="high",
+        complexity="O(n * k * iterations)",
+        deterministic=False,
+    )
+
+    warm_start = True
+
+    def _model(self, num_colors: int, init=None):
+        # scikit-learn takes about a second to import, so it is loaded with the first fit
+        from sklearn.cluster import KMeans
+
+        # _extract passes a private float32 copy, which KMeans may center in place
+        if init is not None:
+            # A palette close to the answer needs a single run and few iterations
+            return KMeans(
+                n_clusters=num_colors, init=init, n_init=1, copy_x=False, random_state=self.seed
+            )
+        return KMeans(n_clusters=num_colors, copy_x=False, random_state=self.seed)
+
+    def _extract(self, colors, weights, num_colors: int, init=None):
+        # Use KMeans to find the dominant colors
+        kmeans = self._model(num_colors, init)
+        # float32 halves the memory of the float64 copy scikit-learn makes otherwise
+        kmeans.fit(
+            colors.astype(np.float32),
+            sample_weight=weights.astype(np.float32),
+        )
+
+        # Get the RGB values of the cluster centers and their pixel counts
+        counts = np.bincount(
+            kmeans.labels_, weights=weights, minlength=num_colors
+        ).astype(np.int64)
+        return [
+            (kmeans.cluster_centers_[i].astype(int).tolist(), counts[i])
+            for i in range(num_colors)
+            if counts[i] > 0
+        ]
+
+
+class MiniBatchKMeansEngine(KMeansEngine):
+    """KMeans on random mini-batches, faster on photos with many distinct colors."""
+
+    name = "minibatch"
+    cost = EngineCost(
+        relative_latency=0.3,
+        accuracy="high",
+        complexity="O(batch_size * k * iterations)",
+        deterministic=False,
+    )
+
+    def _model(self, num_colors: int, init=None):
+        from sklearn.cluster import MiniBatchKMeans
+
+        if init is not None:
+            return MiniBatchKMeans(
+                n_clusters=num_colors, batch_size=4096, init=init, n_init=1, random_state=self.seed
+            )
+        return MiniBatchKMeans(n_clusters=num_colors, batch_size=4096, random_state=self.seed)
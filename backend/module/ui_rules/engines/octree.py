@@ -0,0 +1,59 @@
+import numpy as np
+from .base import EngineCost, PaletteEngine, assign_to_palette, weighted_means
+from ..unique_colors import pack_colors
+
+
+class OctreeEngine(PaletteEngine):
+    """Octree color quantization: merge the least populated nodes from the deepest level up."""
+
+    name = "octree"
+    cost = EngineCost(
+        relative_latency=0.1,
+        accuracy="medium",
+        complexity="O(n * depth)",
+        deterministic=True,
+    )
+
+    def _extract(self, colors, weights, num_colors: int):
+        colors_int = colors.astype(np.uint32)
+        # Node of every color as (depth << 24) | packed color prefix, starting at the leaves
+        nodes = pack_colors(colors_int).astype(np.int64) | (8 << 24)
+
+        for depth in range(7, -1, -1):
+            node_ids, node_of_color = np.unique(nodes, return_inverse=True)
+            leaves = len(node_ids)
+            if leaves <= num_colors:
+                break
+
+            # Parent of every node one level up
+            parents = pack_colors(colors_int >> (8 - depth)).astype(np.int64) | (
+                depth << 24
+            )
+            parent_of_node = np.zeros(leaves, dtype=np.int64)
+            parent_of_node[node_of_color] = parents
+            parent_ids, parent_index = np.unique(parent_of_node, return_inverse=True)
+            children = np.bincount(parent_index)
+            parent_weights = np.bincount(
+                parent_index,
+                weights=np.bincount(node_of_color, weights=weights, minlength=leaves),
+            )
+
+            if len(parent_ids) >= num_colors:
+                # The whole level can be reduced and still leave enough leaves
+                nodes = parents
+                continue
+
+            # Reduce the lightest parents while at least num_colors leaves remain
+            merged = np.zeros(len(parent_ids), dtype=bool)
+            for parent in np.argsort(parent_weights, kind="stable"):
+                if children[parent] > 1 and leaves - (children[parent] - 1) >= num_colors:
+                    merged[parent] = True
+                    leaves -= children[parent] - 1
+            merge_color = merged[parent_index[node_of_color]]
+            nodes = np.where(merge_color, parents, nodes)
+            break
+
+        node_ids, labels = np.unique(nodes, return_inverse=True)
+        means, totals = weighted_means(colors, weights, labels, len(node_ids))
+        top = np.argsort(totals)[::-1][:num_colors]
+        return assign_to_palette(colors, weights, means[top])
@@ -0,0 +1,82 @@
+import hashlib
+import numpy as np
+
+TILE_SIZE = 128
+
+
+def tile_slices(height: int, width: int, tile_size: int = TILE_SIZE):
+    """
+    Split an image into a grid of square tiles, row by row.
+    :return: A list of (row slice, column slice) tuples.
+    """
+    return [
+        (slice(y, min(y + tile_size, height)), slice(x, min(x + tile_size, width)))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def tile_hashes(image, tiles):
+    """
+    Hash the pixels of every tile.
+    :param image: A numpy array of the image's RGB pixels.
+    :param tiles: Tiles from tile_slices.
+    :return: A list of digests, one per tile.
+    """
+    return [
+        hashlib.blake2b(np.ascontiguousarray(image[rows, cols]), digest_size=16).digest()
+        for rows, cols in tiles
+    ]
+
+
+class ColorState:
+    def __init__(
+        self,
+        shape,
+        tile_size,
+        hashes,
+        partials,
+        colors,
+        counts,
+        engine,
+        num_colors,
+        dominant_colors,
+    ):
+        """
+        Per-tile color counts and palette of one analysis, reused to analyse a revision of
+        the same screen.
+        :param shape: Shape of the decoded image.
+        :param tile_size: Side of the square tiles in pixels.
+        :param hashes: Digest of every tile.
+        :param partials: (colors, counts) of every tile, as returned by unique_colors.
+        :param colors: Distinct colors of the whole image, the merged partials.
+        :param counts: Pixel count of every distinct color.
+        :param engine: Name of the palette engine that produced dominant_colors.
+        :param num_colors: Number of dominant colors extracted.
+        :param dominant_colors: The list of (color, count) tuples that was returned.
+        """
+        self.shape = tuple(shape)
+        self.tile_size = tile_size
+        self.hashes = hashes
+        self.partials = partials
+        self.colors = colors
+        self.counts = counts
+        self.engine = engine
+        self.num_colors = num_colors
+        self.dominant_colors = dominant_colors
+
+    @property
+    def palette(self):
+        return np.array([color for color, _ in self.dominant_colors], dtype=np.float64)
+
+    def reusable_for(self, image, tile_size: int):
+        """
+        :return: Whether the tiles of this state line up with the tiles of the image.
+        """
+        return self.shape == image.shape and self.tile_size == tile_size
+
+    def changed_tiles(self, hashes):
+        """
+        :return: Indices of the tiles whose pixels differ from this state.
+        """
+        return [index for index, (old, new) in enumerate(zip(self.hashes, hashes)) if old != new]
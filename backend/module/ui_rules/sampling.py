@@ -0,0 +1,103 @@
+import math
+import numpy as np
+
+SAMPLING_STRATEGIES = ("uniform", "stratified")
+
+
+def percentage_error_bound(sample_size: int, num_colors: int = 3, confidence: float = 0.99):
+    """
+    Bound on how far a percentage measured on a sample can drift from the full image.
+
+    Each sampled pixel is assigned to its nearest reported color, so the share of a
+    color is the mean of a 0/1 variable over the sample. By Hoeffding's inequality and a
+    union bound over the colors, with probability `confidence` every reported percentage
+    is within the returned number of percentage points of the share the same colors get
+    when every foreground pixel of the image is assigned to its nearest one. The drift
+    depends on the number of foreground samples only, which is why ColorModule samples
+    foreground pixels: for 100,000 of them and 3 colors at 99% it is about 0.57 points,
+    whatever the resolution or the share of background. It does not cover how far the
+    colors themselves would move when clustering every pixel instead of the sample.
+    :param sample_size: Number of sampled foreground pixels.
+    :param num_colors: Number of dominant colors being reported.
+    :param confidence: Probability that the bound holds.
+    :return: The bound in percentage points.
+    """
+    if sample_size <= 0:
+        raise ValueError("sample_size must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    delta = 1 - confidence
+    return 100 * math.sqrt(math.log(2 * num_colors / delta) / (2 * sample_size))
+
+
+def _uniform_indices(mask, count, sample_size, rng):
+    # Pick ranks among the count foreground pixels, then find the pixel of every rank row
+    # by row; this needs memory for the sample and one row, not an index per pixel.
+    ranks = np.sort(rng.choice(count, size=sample_size, replace=False))
+    row_ends = np.cumsum(np.count_nonzero(mask, axis=1))
+    rows = np.searchsorted(row_ends, ranks, side="right")
+    indices = np.empty(sample_size, dtype=np.int64)
+    splits = np.flatnonzero(np.diff(rows)) + 1
+    for group in np.split(np.arange(sample_size), splits):
+        row = rows[group[0]]
+        row_start = row_ends[row - 1] if row > 0 else 0
+        columns = np.flatnonzero(mask[row])[ranks[group] - row_start]
+        indices[group] = row * mask.shape[1] + columns
+    return indices
+
+
+def _stratified_indices(mask, sample_size, rng, tiles=8):
+    # Split the image into a grid and sample every tile in proportion to its foreground,
+    # so small regions such as accent colors are never missed by chance.
+    height, width = mask.shape
+    row_edges = np.linspace(0, height, min(tiles, height) + 1).astype(int)
+    col_edges = np.linspace(0, width, min(tiles, width) + 1).astype(int)
+    total = np.count_nonzero(mask)
+    indices = []
+    for top, bottom in zip(row_edges[:-1], row_edges[1:]):
+        for left, right in zip(col_edges[:-1], col_edges[1:]):
+            tile_w = right - left
+            flat = np.flatnonzero(mask[top:bottom, left:right])
+            count = min(len(flat), int(round(sample_size * len(flat) / total)))
+            if count == 0:
+                continue
+            flat = flat[rng.choice(len(flat), size=count, replace=False)]
+            rows = top + flat // tile_w
+            cols = left + flat % tile_w
+            indices.append(rows * width + cols)
+    return np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+
+
+def sample_pixels(
+    image, strategy: str = "uniform", sample_size: int = 100_000, seed=None, mask=None
+):
+    """
+    Pick a fixed number of pixels from the image.
+    :param image: A numpy array of the image's RGB pixels (height, width, 3).
+    :param strategy: "uniform" for a fixed random budget, "stratified" to sample every tile.
+    :param sample_size: Number of pixels to keep.
+    :param seed: Seed for the random generator (optional).
+    :param mask: Boolean array (height, width); only pixels where it is True are sampled
+        (default is every pixel).
+    :return: A numpy array of sampled RGB pixels, at most (sample_size, 3); every
+        candidate pixel when there are no more than sample_size of them.
+    """
+    if strategy not in SAMPLING_STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+    if sample_size <= 0:
+        raise ValueError("sample_size must be positive")
+
+    height, width = image.shape[:2]
+    pixels = image.reshape(-1, 3)
+    if mask is None:
+        mask = np.ones((height, width), dtype=bool)
+    count = int(np.count_nonzero(mask))
+    if count <= sample_size:
+        return pixels[mask.reshape(-1)]
+
+    rng = np.random.default_rng(seed)
+    if strategy == "uniform":
+        indices = _uniform_indices(mask, count, sample_size, rng)
+    else:
+        indices = _stratified_indices(mask, sample_size, rng)
+    return pixels[indices]
@@ -1,13 +1,41 @@
+from module.metrics import NULL_TIMER
 from .color import ColorModule
 
 
 class UIRulesModule:
-    def __init__(self, image_byte: bytes):
+    def __init__(
+        self,
+        image_byte: bytes,
+        num_colors: int = 3,
+        timer=None,
+        previous=None,
+        **color_options
+    ):
         """
-        Initialize the UIRulesModule with the image path and color module.
-        :param image_path: Path to the image file.
+        Initialize the UIRulesModule with the image bytes and color module.
+        :param image_byte: Bytes of the image file.
+        :param num_colors: Number of dominant colors to extract (default is 3).
+        :param timer: StageTimer recording the duration of each stage (optional).
+        :param previous: State of the analysis of a previous revision (see the state
+            property); only the tiles that changed since then are analysed again (optional).
+        :param color_options: Extra options passed to ColorModule (e.g. sample, sample_size).
         """
-        self.color_module = ColorModule(image_byte)
+        self.timer = timer or NULL_TIMER
+        self.color_module = ColorModule(
+            image_byte,
+            num_colors=num_colors,
+            timer=self.timer,
+            previous=previous,
+            **color_options,
+        )
+
+    @property
+    def state(self):
+        """
+        State to pass as `previous` when analysing the next revision, or None unless the
+        analysis was incremental (see ColorModule's incremental option).
+        """
+        return self.color_module.state
 
     def check_60_30_10_rule(self, acceptable_range=5):
         """
@@ -17,7 +45,21 @@ class UIRulesModule:
             result (dict): Dictionary with rule validation and detailed breakdown.
         """
         dominant_colors = self.color_module.extract_dominant_colors()
+        with self.timer.stage("rules"):
+            result = self.evaluate_60_30_10(dominant_colors, acceptable_range)
+        if self.color_module.error_bound is not None:
+            # Sampled analyses report how far each percentage may be off, in points
+            result["percentage_error_bound"] = self.color_module.error_bound
+        return result
 
+    @staticmethod
+    def evaluate_60_30_10(dominant_colors, acceptable_range=5):
+        """
+        Check already extracted dominant colors against the 60-30-10 UI rule.
+        :param dominant_colors: A list of (color, count) tuples from ColorModule.
+        :param acceptable_range: Allowed deviation in percent for each color.
+        :return: The same dictionary as check_60_30_10_rule.
+        """
         # Convert the list of colors to a list of dictionaries with percentages
         total_pixels = sum([color[1] for color in dominant_colors])
         dominant_colors = [
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def pack_colors(pixels):
+    """
+    Pack RGB pixels into 24-bit integers (0xRRGGBB).
+    :param pixels: A numpy array of RGB pixels (n, 3) with values 0-255.
+    :return: A numpy uint32 array (n,).
+    """
+    pixels = np.asarray(pixels)
+    # Shift and combine in place so only the uint32 result is allocated
+    packed = pixels[:, 0].astype(np.uint32)
+    packed <<= 8
+    packed |= pixels[:, 1]
+    packed <<= 8
+    packed |= pixels[:, 2]
+    return packed
+
+
+def unpack_colors(packed):
+    """
+    Unpack 24-bit integers into RGB pixels.
+    :param packed: A numpy integer array (n,) of 0xRRGGBB values.
+    :return: A numpy uint8 array of RGB pixels (n, 3).
+    """
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack(
+        [(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=1
+    ).astype(np.uint8)
+
+
+# Larger than any packed color, so masked-out pixels sort after every real color
+_MASKED = np.uint32(0xFFFFFFFF)
+
+
+def unique_colors(pixels, mask=None):
+    """
+    Count every distinct color.
+    :param pixels: A numpy array of RGB pixels (n, 3) or an image (height, width, 3).
+    :param mask: Boolean array of the pixels to count, (n,) or (height, width) (optional).
+    :return: A tuple (colors, counts): distinct RGB colors (m, 3) and how often each occurs (m,).
+    """
+    # Counting works on one packed uint32 per pixel, sorted in place, instead of
+    # np.unique which sorts a copy; masked-out pixels are never copied out of the image.
+    packed = pack_colors(np.asarray(pixels).reshape(-1, 3))
+    if mask is not None:
+        np.copyto(packed, _MASKED, where=~np.asarray(mask).reshape(-1))
+    packed.sort()
+    if mask is not None:
+        packed = packed[: np.searchsorted(packed, _MASKED)]
+    if len(packed) == 0:
+        return np.empty((0, 3), dtype=np.uint8), np.empty(0, dtype=np.int64)
+
+    starts = np.flatnonzero(packed[1:] != packed[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    counts = np.diff(np.append(starts, len(packed)))
+    return unpack_colors(packed[starts]), counts
+
+
+def merge_color_counts(partials):
+    """
+    Merge distinct colors counted separately, e.g. per tile.
+    :param partials: An iterable of (colors, counts) tuples as returned by unique_colors.
+    :return: A tuple (colors, counts) equal to unique_colors over all the pixels at once.
+    """
+    partials = list(partials)
+    if not partials:
+        return np.empty((0, 3), dtype=np.uint8), np.empty(0, dtype=np.int64)
+    values = np.concatenate([pack_colors(colors) for colors, _ in partials])
+    counts = np.concatenate([counts for _, counts in partials])
+    values, inverse = np.unique(values, return_inverse=True)
+    counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(values))
+    return unpack_colors(values), counts.astype(np.int64)
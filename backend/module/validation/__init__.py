@@ -1,3 +1,4 @@
 from .format_name import FormatName
+from .image import ImageHandler, ImageInfo, ImageValidationError
 
-__all__ = ["FormatName"]
+__all__ = ["FormatName", "ImageHandler", "ImageInfo", "ImageValidationError"]
@@ -1,3 +1,124 @@
-# This ImageHandler class will be use to.
-# 1. Validate the image file
-# 2. Extract byte data to used able data 
+import io
+from PIL import Image, ImageMode, UnidentifiedImageError
+
+SUPPORTED_FORMATS = ("PNG", "JPEG", "WEBP", "GIF", "BMP")
+
+
+class ImageValidationError(ValueError):
+    def __init__(self, message: str, status_code: int = 400):
+        """
+        Raised when an upload is not an image the backend accepts.
+        :param message: Reason shown to the client.
+        :param status_code: HTTP status code to answer with (400 or 413).
+        """
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ImageInfo:
+    def __init__(self, format: str, width: int, height: int, mode: str, frames: int):
+        """
+        Facts about an image read from its header.
+        :param format: Container format, e.g. "PNG".
+        :param width: Width in pixels.
+        :param height: Height in pixels.
+        :param mode: Pillow mode, e.g. "RGBA".
+        :param frames: Number of frames (1 for still images).
+        """
+        self.format = format
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.frames = frames
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+    @property
+    def decode_bytes(self):
+        """
+        Bytes Pillow holds at once to decode one frame at full resolution and convert it
+        to RGB. Frames are decoded one at a time, so the frame count does not add to it.
+        :return: width * height * bytes per pixel of the mode, plus the RGB copy.
+        """
+        mode = ImageMode.getmode(self.mode)
+        per_pixel = len(mode.bands) * int(mode.typestr[-1])
+        if len(mode.bands) > 1:
+            # Pillow stores the pixels of multi-band modes in (at least) four bytes
+            per_pixel = max(per_pixel, 4)
+        if self.mode != "RGB":
+            per_pixel += 4
+        return self.pixels * per_pixel
+
+    @property
+    def draftable(self):
+        """
+        :return: True if the format can be decoded directly at a reduced scale.
+        """
+        return self.format == "JPEG"
+
+
+class ImageHandler:
+    """
+    Validate an uploaded image file before it is analysed.
+
+    Only the container header is read, so rejecting a bad upload costs almost nothing.
+    """
+
+    def __init__(
+        self,
+        image_byte: bytes,
+        max_pixels: int = 100_000_000,
+        max_frames: int = 16,
+        formats=SUPPORTED_FORMATS,
+    ):
+        """
+        :param image_byte: Bytes of the image file.
+        :param max_pixels: Largest accepted width * height.
+        :param max_frames: Largest accepted number of frames.
+        :param formats: Accepted container formats.
+        """
+        if not isinstance(image_byte, (bytes, bytearray)):
+            raise TypeError("image_byte must be a bytes-like object")
+        self.image_byte = image_byte
+        self.max_pixels = max_pixels
+        self.max_frames = max_frames
+        self.formats = formats
+
+    def inspect(self):
+        """
+        Read the image header without decoding pixel data.
+        :return: An ImageInfo.
+        :raises ImageValidationError: If the bytes are not a readable image.
+        """
+        try:
+            with Image.open(io.BytesIO(self.image_byte)) as image:
+                return ImageInfo(
+                    format=image.format,
+                    width=image.width,
+                    height=image.height,
+                    mode=image.mode,
+                    frames=getattr(image, "n_frames", 1),
+                )
+        except Image.DecompressionBombError:
+            raise ImageValidationError("Image has too many pixels.", status_code=413)
+        except (UnidentifiedImageError, OSError, ValueError):
+            raise ImageValidationError("Upload is not a supported image.")
+
+    def validate(self):
+        """
+        Check the header against the accepted formats and limits.
+        :return: An ImageInfo.
+        :raises ImageValidationError: If the image is unsupported or too large.
+        """
+        info = self.inspect()
+        if info.format not in self.formats:
+            raise ImageValidationError(f"Unsupported image format: {info.format}")
+        if info.width == 0 or info.height == 0:
+            raise ImageValidationError("Image is empty.")
+        if info.pixels > self.max_pixels:
+            raise ImageValidationError("Image has too many pixels.", status_code=413)
+        if info.frames > self.max_frames:
+            raise ImageValidationError("Image has too many frames.", status_code=413)
+        return info
@@ -0,0 +1,4 @@
+from .pool import AnalysisPool, PoolSaturatedError
+from .threads import default_threads, pin_threads
+
+__all__ = ["AnalysisPool", "PoolSaturatedError", "default_threads", "pin_threads"]
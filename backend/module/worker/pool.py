@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class AnalysisPool:
+    def __init__(self, max_workers: int, max_pending: int, initializer=None, initargs=()):
+        """
+        Run CPU-bound analysis in a process pool with admission control.
+        :param max_workers: Number of worker processes.
+        :param max_pending: Number of jobs allowed to wait for a free worker.
+        :param initializer: Function run once in every new worker process, e.g. to warm it up.
+        :param initargs: Arguments passed to the initializer.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_pending < 0:
+            raise ValueError("max_pending must not be negative")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        self._in_flight = 0
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_pending
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def worker_pids(self):
+        """
+        :return: Process ids of the running worker processes.
+        """
+        if self._executor is None:
+            return []
+        return sorted(self._executor._processes or ())
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def warm_up(self):
+        """
+        Start every worker process and wait until they have run the initializer.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, os.getpid) for _ in range(self.max_workers))
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker process without blocking the event loop.
+        :raises PoolSaturatedError: If the pool and its queue are full.
+        """
+        if self._in_flight >= self.capacity:
+            raise PoolSaturatedError("analysis pool is saturated")
+
+        # The counter is only touched from the event loop thread, so no lock is needed.
+        self._in_flight += 1
+        try:
+            self.start()
+            executor = self._executor
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    executor, functools.partial(fn, *args, **kwargs)
+                )
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); replace the pool for the next job,
+                # unless another failed job already did and newer jobs run in the new pool.
+                if self._executor is executor:
+                    self.shutdown(wait=False)
+                raise
+        finally:
+            self._in_flight -= 1
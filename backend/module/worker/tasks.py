@@ -0,0 +1,72 @@
+import io
+import time
+from module.metrics import NULL_TIMER, StageTimer
+from .threads import pin_threads
+
+
+def analyze_60_30_10(
+    image_byte: bytes, acceptable_range: float = 5, timing: bool = False, **color_options
+):
+    """
+    Run the 60-30-10 analysis. Executed inside a pool worker process.
+    :param image_byte: Bytes of the image file.
+    :param acceptable_range: Allowed deviation in percent for each color.
+    :param timing: Record the duration of each stage.
+    :param color_options: Options passed to ColorModule (e.g. num_colors, sample, previous,
+        incremental).
+    :return: A tuple (result, report): the result of UIRulesModule.check_60_30_10_rule and
+        a dictionary with the worker start time, image megapixels, stage timings and, for
+        incremental analyses, the state to pass as `previous` for the next revision.
+    """
+    # Imported here so that the API process can reference this task without loading
+    # OpenCV, Pillow and scikit-learn; workers pay for the import once.
+    from module.ui_rules import UIRulesModule
+
+    started_at = time.time()
+    timer = StageTimer() if timing else NULL_TIMER
+    ui = UIRulesModule(image_byte, timer=timer, **color_options)
+    result = ui.check_60_30_10_rule(acceptable_range)
+    height, width = ui.color_module.image.shape[:2]
+    report = {
+        "started_at": started_at,
+        "megapixels": height * width / 1_000_000,
+        "stages": timer.to_list(),
+        "state": ui.state,
+    }
+    return result, report
+
+
+def warm_up_image():
+    """
+    Build a tiny PNG with three colors, used to exercise the pipeline at startup.
+    :return: Bytes of the PNG file.
+    """
+    from PIL import Image
+
+    image = Image.new("RGB", (20, 10), (240, 240, 240))
+    image.paste((30, 60, 200), (0, 0, 6, 10))
+    image.paste((220, 40, 40), (6, 0, 8, 10))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def warm_up():
+    """
+    Import the analysis stack and run one tiny analysis so the first request handled by
+    this worker does not pay for it.
+    """
+    analyze_60_30_10(warm_up_image())
+
+
+def init_worker(num_threads: int | None = None, warm: bool = False):
+    """
+    Pool initializer for analysis workers.
+    :param num_threads: Native threads (OpenMP, BLAS, OpenCV) this worker may use; workers
+        sharing a machine each get a slice of the cores instead of one pool per core each.
+    :param warm: Run warm_up before the first job.
+    """
+    if num_threads:
+        pin_threads(num_threads)
+    if warm:
+        warm_up()
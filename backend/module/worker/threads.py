@@ -0,0 +1,42 @@
+import os
+
+# Variables read by OpenMP, OpenBLAS, MKL and friends when they are first loaded
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def default_threads(workers: int, cpu_count: int | None = None):
+    """
+    Divide the cores among worker processes.
+    :param workers: Number of processes sharing the machine.
+    :param cpu_count: Number of cores (default is os.cpu_count()).
+    :return: Native threads each process may use, at least 1.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, workers))
+
+
+def pin_threads(num_threads: int):
+    """
+    Limit the native thread pools of this process (OpenMP, BLAS, OpenCV) to num_threads.
+    Meant to run first thing in a worker process: libraries loaded later read the
+    environment variables, already loaded ones (e.g. NumPy's BLAS inherited from the
+    parent process) are limited through threadpoolctl when it is installed.
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(num_threads)
+
+    import cv2
+
+    cv2.setNumThreads(num_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=num_threads)
@@ -0,0 +1,124 @@
+import os
+
+
+def _env_int(name: str, default):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def _env_float(name: str, default):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return float(value)
+
+
+def _env_ints(name: str, default: tuple):
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return tuple(int(item) for item in value.split(",") if item.strip())
+
+
+class Settings:
+    def __init__(self):
+        """
+        Backend settings, read from environment variables.
+        """
+        # Number of processes running the color analysis (default is one per core).
+        self.analysis_workers = _env_int("ANALYSIS_WORKERS", os.cpu_count() or 1)
+        # Native threads (OpenMP, BLAS, OpenCV) per analysis worker; the default divides
+        # the cores among the workers so their thread pools do not oversubscribe the CPU.
+        self.analysis_threads = _env_int(
+            "ANALYSIS_THREADS", max(1, (os.cpu_count() or 1) // self.analysis_workers)
+        )
+        # Number of requests allowed to wait for a free worker before returning 503.
+        self.analysis_queue_size = _env_int(
+            "ANALYSIS_QUEUE_SIZE", 2 * self.analysis_workers
+        )
+        # Seconds a client is asked to wait before retrying a rejected request.
+        self.retry_after = _env_int("ANALYSIS_RETRY_AFTER", 1)
+        # Import the analysis stack and run a tiny analysis in every worker at startup.
+        self.warmup = bool(_env_int("WARMUP", 0))
+        # Largest accepted upload in bytes; larger requests get 413.
+        self.max_upload_bytes = _env_int("MAX_UPLOAD_BYTES", 50 * 1024 * 1024)
+        # Largest accepted image in pixels, read from the header before decoding.
+        self.max_image_pixels = _env_int("MAX_IMAGE_PIXELS", 100_000_000)
+        # Largest accepted number of frames (animated GIF/WebP/PNG).
+        self.max_image_frames = _env_int("MAX_IMAGE_FRAMES", 16)
+        # Images above this pixel count are decoded at a reduced scale.
+        self.decode_max_pixels = _env_int("DECODE_MAX_PIXELS", 34_000_000)
+        # Bytes one analysis may allocate; larger JPEGs are decoded at a reduced scale and
+        # other images too large to decode within it are refused (unset means no budget
+        # besides DECODE_MAX_PIXELS).
+        self.analysis_memory_budget = _env_int("ANALYSIS_MEMORY_BUDGET", None)
+        # Threads counting colors tile by tile on large images (1 disables tiling). They
+        # come on top of ANALYSIS_THREADS, so a busy server may run
+        # ANALYSIS_WORKERS * TILE_WORKERS threads; lower ANALYSIS_THREADS when raising it.
+        self.tile_workers = _env_int("TILE_WORKERS", 1)
+        # Smallest decoded image, in pixels, split into tiles.
+        self.tile_min_pixels = _env_int("TILE_MIN_PIXELS", 8_000_000)
+        # Pixel counts of the coarse passes /603010/stream sends before the full analysis.
+        self.progressive_pixels = _env_ints("PROGRESSIVE_PIXELS", (65_536, 1_048_576))
+        # Largest number of images per ColorPickerCNN forward pass.
+        self.cnn_max_batch_size = _env_int("CNN_MAX_BATCH_SIZE", 16)
+        # Longest time in milliseconds an image waits for others to join its batch.
+        self.cnn_max_latency_ms = _env_int("CNN_MAX_LATENCY_MS", 5)
+        # Intra-op threads used by torch (unset lets torch decide).
+        self.cnn_threads = _env_int("CNN_THREADS", None)
+        # Directory holding <model name>.pth weight files and their exports.
+        self.model_dir = os.environ.get("MODEL_DIR") or os.path.join(
+            os.path.dirname(__file__), "machine_learning", "models"
+        )
+        # Bytes of model weights kept loaded; least recently used models are unloaded
+        # past it (unset means no limit).
+        self.model_memory_budget = _env_int("MODEL_MEMORY_BUDGET", None)
+        # Seconds between checks for changed weight files (0 checks on every call).
+        self.model_reload_interval = _env_float("MODEL_RELOAD_INTERVAL", 2.0)
+        # Force a ColorPickerCNN runtime: onnx, torchscript-int8, torchscript or eager.
+        self.cnn_runtime = os.environ.get("CNN_RUNTIME") or None
+        # Record per-stage durations for Server-Timing headers and /metrics (0 disables it).
+        self.stage_timing = bool(_env_int("STAGE_TIMING", 1))
+        # Number of results kept in the in-memory LRU cache (0 disables it).
+        self.result_cache_size = _env_int("RESULT_CACHE_SIZE", 1024)
+        # Directory for cached results that survive restarts (unset disables it).
+        self.result_cache_dir = os.environ.get("RESULT_CACHE_DIR") or None
+        # Bytes of results kept in RESULT_CACHE_DIR; the least recently used are deleted.
+        self.result_cache_dir_bytes = _env_int("RESULT_CACHE_DIR_BYTES", 1024**3)
+
+        # Number of analyses whose per-tile state is kept for incremental re-analysis of
+        # revised screenshots (0 disables it).
+        self.analysis_state_cache_size = _env_int("ANALYSIS_STATE_CACHE_SIZE", 64)
+        # Number of images of one /batch request analysed at the same time.
+        self.batch_concurrency = _env_int("BATCH_CONCURRENCY", self.analysis_workers)
+        # Largest number of images in one /batch request.
+        self.batch_max_items = _env_int("BATCH_MAX_ITEMS", 5000)
+        # Largest total upload size in bytes of one /batch request.
+        self.batch_max_upload_bytes = _env_int("BATCH_MAX_UPLOAD_BYTES", 2 * 1024**3)
+        # SQLite file holding background jobs and their results.
+        self.job_db = os.environ.get("JOB_DB") or "jobs.sqlite3"
+        # Number of background jobs running at the same time.
+        self.job_concurrency = _env_int("JOB_CONCURRENCY", self.analysis_workers)
+        # Number of background jobs one client may have running.
+        self.job_client_concurrency = _env_int("JOB_CLIENT_CONCURRENCY", 2)
+        # Number of background jobs one client may have waiting; more get 429.
+        self.job_client_queue_size = _env_int("JOB_CLIENT_QUEUE_SIZE", 100)
+        # Longest long-poll wait in seconds for GET /jobs/{id}?wait=.
+        self.job_max_wait = _env_int("JOB_MAX_WAIT", 30)
+        # Seconds finished jobs are kept before they are deleted.
+        self.job_retention = _env_int("JOB_RETENTION", 24 * 60 * 60)
+        # Seconds between deletions of finished jobs older than JOB_RETENTION.
+        self.job_purge_interval = _env_int("JOB_PURGE_INTERVAL", 60 * 60)
+        # Seconds between heartbeats of running jobs; every round also picks up jobs
+        # queued by other processes sharing JOB_DB.
+        self.job_heartbeat_interval = _env_int("JOB_HEARTBEAT_INTERVAL", 10)
+        # Seconds without a heartbeat after which a running job is queued again, e.g.
+        # when the process running it was killed.
+        self.job_stale_after = _env_int("JOB_STALE_AFTER", 60)
+        # SQLite file storing the palette of every analysis for search and export.
+        self.palette_db = os.environ.get("PALETTE_DB") or "palettes.sqlite3"
+
+
+settings = Settings()
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Settings are read on import, so the app under test must not touch the databases of a
+# local server in the backend directory
+_directory = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("JOB_DB", os.path.join(_directory, "jobs.sqlite3"))
+os.environ.setdefault("PALETTE_DB", os.path.join(_directory, "palettes.sqlite3"))
+os.environ.setdefault("RESULT_CACHE_DIR", "")
+os.environ.setdefault("ANALYSIS_WORKERS", "1")
@@ -0,0 +1,81 @@
+import json
+import os
+from PIL import Image
+import audit
+
+OPTIONS = {"engine": "histogram"}
+
+
+def _palette_image(primary):
+    image = Image.new("RGB", (100, 100), primary)
+    image.paste((0, 160, 0), (60, 0, 90, 100))
+    image.paste((0, 0, 220), (90, 0, 100, 100))
+    return image
+
+
+def _crash_on(path, acceptable_range, options):
+    if "crash" in os.path.basename(path):
+        os._exit(1)
+    return _audit_file(path, acceptable_range, options)
+
+
+_audit_file = audit.audit_file
+
+
+def test_partial_last_record_is_dropped(tmp_path):
+    output = tmp_path / "audit.jsonl"
+    output.write_text(json.dumps({"key": "a", "status": "ok"}) + '\n{"key": "b", "sta')
+    writer = audit.ResultWriter(str(output))
+    assert writer.done_keys() == {"a"}
+    with writer:
+        writer.write({"key": "c", "status": "failed"})
+    assert [json.loads(line)["key"] for line in output.read_text().splitlines()] == ["a", "c"]
+
+
+def test_crashed_worker_is_recorded_and_audit_resumes(tmp_path, monkeypatch):
+    images = tmp_path / "images"
+    images.mkdir()
+    for name, shade in (("a.png", 40), ("b-crash.png", 120), ("c.png", 200)):
+        _palette_image((shade, 0, 0)).save(images / name)
+    # Workers are forked, so they inherit the patched function
+    monkeypatch.setattr(audit, "audit_file", _crash_on)
+    output = str(tmp_path / "audit.jsonl")
+
+    paths = audit.find_images([str(images)])
+    counts = audit.run(paths, audit.ResultWriter(output), 5, OPTIONS, 1)
+    with open(output) as f:
+        records = {os.path.basename(record["path"]): record for record in map(json.loads, f)}
+    assert records["a.png"]["status"] == "ok"
+    assert records["b-crash.png"]["status"] == "failed" and counts["failed"] >= 1
+
+    # Every image not analysed because of the crash is analysed on the next run
+    monkeypatch.setattr(audit, "audit_file", _audit_file)
+    counts = audit.run(paths, audit.ResultWriter(output), 5, OPTIONS, 1)
+    assert counts == {"ok": 2, "skipped": 1, "invalid": 0, "failed": 0}
+
+
+def test_image_too_large_to_decode_within_the_budget_is_invalid(tmp_path, monkeypatch):
+    path = tmp_path / "wide.png"
+    _palette_image((200, 0, 0)).resize((400, 400)).save(path)
+    # 400 * 400 RGB pixels take 640 000 bytes once decoded; a JPEG could be drafted instead
+    monkeypatch.setattr(audit.settings, "analysis_memory_budget", 500_000)
+    record = audit.audit_file(str(path), 5, OPTIONS)
+    assert record["status"] == "invalid" and "memory budget" in record["error"]
+
+    jpeg = tmp_path / "wide.jpg"
+    _palette_image((200, 0, 0)).resize((400, 400)).save(jpeg)
+    assert audit.audit_file(str(jpeg), 5, OPTIONS)["status"] == "ok"
+
+
+def test_audit_key_matches_the_api_key(tmp_path):
+    import app
+    from module.cache import result_key
+    from module.validation import ImageHandler
+
+    path = tmp_path / "a.png"
+    _palette_image((200, 0, 0)).save(path)
+    image_byte = path.read_bytes()
+    options = {"engine": "histogram", "sample": "uniform", "sample_size": 1000}
+    record = audit.audit_file(str(path), 5, options)
+    info = ImageHandler(image_byte).validate()
+    assert record["key"] == result_key(image_byte, 5, app._color_options(info, **options))
@@ -0,0 +1,41 @@
+import json
+import os
+import numpy as np
+from PIL import Image
+from machine_learning.dataset import ShardDataset, build_shard, shard_exists
+from machine_learning.paths import LABELS_FILE
+
+
+def _image_set(directory, count=2):
+    data = []
+    for i in range(count):
+        name = f"{i}.png"
+        Image.new("RGB", (32, 16), (i * 100, 0, 0)).save(directory / name)
+        colors = {"primary": "#ff0000", "secondary": "#00ff00", "accent": "#0000ff"}
+        data.append({"name": name, "color": colors})
+    (directory / LABELS_FILE).write_text(json.dumps(data))
+
+
+def test_shard_is_rebuilt_when_the_image_set_changes(tmp_path):
+    images, shard = tmp_path / "images", tmp_path / "shard"
+    images.mkdir()
+    _image_set(images)
+    assert not shard_exists(shard, images)
+
+    build_shard(images, shard, size=8, log=lambda message: None)
+    assert shard_exists(shard, images)
+    dataset = ShardDataset(shard)
+    assert len(dataset) == 2 and dataset.images.shape == (2, 8, 8, 3)
+    assert sorted(os.listdir(shard)) == ["images.npy", "key.txt", "labels.npy", "names.json"]
+
+    os.utime(images / "1.png", ns=(0, 0))
+    assert not shard_exists(shard, images)
+    build_shard(images, shard, size=8, log=lambda message: None)
+    assert shard_exists(shard, images)
+
+    labels = json.loads((images / LABELS_FILE).read_text())
+    labels[0]["color"]["accent"] = "#000000"
+    (images / LABELS_FILE).write_text(json.dumps(labels))
+    assert not shard_exists(shard, images)
+    build_shard(images, shard, size=8, log=lambda message: None)
+    assert np.allclose(ShardDataset(shard).labels[0][2], 0)
@@ -0,0 +1,40 @@
+import io
+import json
+import pytest
+from PIL import Image
+from machine_learning.evaluate import _engine_backend, evaluate, summarize
+from machine_learning.paths import LABELS_FILE
+
+COLORS = {"primary": "#ff0000", "secondary": "#00ff00", "accent": "#0000ff"}
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("engine", ["kmeans", "histogram"])
+def test_engine_backend_pads_to_three_colors(engine):
+    assert _engine_backend(engine)(_png((200, 10, 10))) == [[200, 10, 10]] * 3
+
+
+def test_failed_images_are_recorded(tmp_path):
+    for name in ("a.png", "b.png"):
+        (tmp_path / name).write_bytes(_png((255, 0, 0)))
+    labels = [{"name": name, "color": COLORS} for name in ("a.png", "b.png")]
+    (tmp_path / LABELS_FILE).write_text(json.dumps(labels))
+
+    def flaky(image_byte):
+        if flaky.calls:
+            raise ValueError("broken")
+        flaky.calls += 1
+        return [[255, 0, 0], [0, 255, 0], [0, 0, 255]]
+
+    flaky.calls = 0
+    csv_path = str(tmp_path / "results.csv")
+    records = evaluate({"flaky": flaky}, str(tmp_path), csv_path, log=lambda _: None)
+    assert [record.get("error") for record in records] == [None, "ValueError('broken')"]
+    summary = summarize(records)["flaky"]
+    assert summary["images"] == 1 and summary["failures"] == 1 and summary["mae"] == 0
+    assert len((tmp_path / "results.csv").read_text().splitlines()) == 3
@@ -0,0 +1,28 @@
+import os
+import torch
+import torch.nn as nn
+from machine_learning.utils.get_model import ModelRegistry
+
+
+def _save(path, value):
+    model = nn.Linear(2, 1)
+    nn.init.constant_(model.weight, value)
+    torch.save(model.state_dict(), str(path) + ".tmp")
+    os.replace(str(path) + ".tmp", path)
+
+
+def test_replaced_and_removed_weights(tmp_path):
+    path = tmp_path / "model.pth"
+    _save(path, 1.0)
+    registry = ModelRegistry(reload_interval=0)
+    registry.register("model", lambda: nn.Linear(2, 1), path=str(path))
+    first = registry.get("model")
+
+    # A replaced file is reloaded, and the model already handed out keeps its weights
+    _save(path, 2.0)
+    second = registry.get("model")
+    assert second is not first
+    assert first.weight.eq(1.0).all() and second.weight.eq(2.0).all()
+
+    path.unlink()
+    assert registry.get("model") is second
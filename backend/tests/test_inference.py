@@ -0,0 +1,26 @@
+import threading
+import time
+from machine_learning import inference
+
+
+def test_concurrent_callers_start_one_batching_thread(monkeypatch):
+    loads = []
+
+    def load_runtime(model_name, runtime, num_threads):
+        loads.append(model_name)
+        # Loading takes a while, so the other callers arrive before it finishes
+        time.sleep(0.05)
+        return "eager", None
+
+    monkeypatch.setattr(inference, "load_runtime", load_runtime)
+    predictor = inference.BatchedPredictor()
+    callers = [threading.Thread(target=predictor.start) for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    try:
+        assert loads == ["color_picker_cnn"]
+        assert [t.name for t in threading.enumerate()].count("color_picker_cnn-batcher") == 1
+    finally:
+        predictor.stop()
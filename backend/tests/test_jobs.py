@@ -0,0 +1,78 @@
+import asyncio
+import time
+from module.jobs import JobScheduler, JobStore
+
+
+def test_only_one_process_claims_a_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobStore(path), JobStore(path)
+    job_id = first.create(b"image", {}, "client")
+    assert first.claim(job_id)
+    assert not second.claim(job_id)
+    assert second.status(job_id) == "running"
+
+
+def test_only_stale_running_jobs_are_recovered():
+    store = JobStore()
+    alive, stale = store.create(b"a", {}, "client"), store.create(b"b", {}, "client")
+    store.claim(alive), store.claim(stale)
+    store._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 120, stale))
+    assert store.recover(stale_after=60) == 1
+    assert store.status(alive) == "running" and store.status(stale) == "queued"
+    assert [job_id for job_id, _, _ in store.pending()] == [stale]
+
+
+def test_jobs_of_other_processes_run_once_and_can_be_long_polled(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    runs = []
+
+    async def runner(image_byte, params):
+        runs.append(image_byte)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def main():
+        stores = [JobStore(path), JobStore(path)]
+        schedulers = [
+            JobScheduler(
+                store, runner, max_running=2, heartbeat_interval=0.05, poll_interval=0.05
+            )
+            for store in stores
+        ]
+        for scheduler in schedulers:
+            scheduler.start()
+        # Submitted through the first process only; the second sees it in the store
+        job_id = stores[0].create(b"image", {}, "client")
+        schedulers[0].submit(job_id, "client")
+        await asyncio.wait_for(schedulers[1].wait(job_id, timeout=5), 6)
+        status = stores[1].status(job_id)
+        await asyncio.sleep(0.2)
+        for scheduler in schedulers:
+            await scheduler.stop()
+        return status
+
+    assert asyncio.run(main()) == "done"
+    assert runs == [b"image"]
+
+
+def test_finished_jobs_are_purged_periodically():
+    store = JobStore()
+    job_id = store.create(b"image", {}, "client")
+    store.claim(job_id)
+    store.finish(job_id, {})
+
+    async def main():
+        scheduler = JobScheduler(
+            store,
+            None,
+            max_running=1,
+            heartbeat_interval=0.01,
+            retention=0.05,
+            purge_interval=0.01,
+        )
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert store.status(job_id) is None
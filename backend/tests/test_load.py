@@ -0,0 +1,21 @@
+import asyncio
+import httpx
+from benchmark.load import LoadRecorder, _send
+
+
+def _failing_app(request):
+    raise IndexError("list index out of range")
+
+
+def test_failed_requests_count_as_errors():
+    async def send():
+        recorder = LoadRecorder(0.0)
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(_failing_app), base_url="http://loadtest"
+        ) as client:
+            await _send(client, recorder, ("a.png", b"", 1), {}, 0.0)
+        return recorder.summary(1.0)
+
+    summary = asyncio.run(send())
+    assert summary["statuses"] == {"IndexError": 1}
+    assert summary["error_rate"] == 1.0
@@ -0,0 +1,133 @@
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+import pytest
+from PIL import Image
+from benchmark.memory import reset_peak_rss
+from module.ui_rules.color import PEAK_BYTES_PER_PIXEL, ColorModule
+from module.validation import ImageHandler, ImageValidationError
+
+IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "..", "image", "*.png")))
+BACKEND = os.path.join(os.path.dirname(__file__), "..")
+
+# Runs one analysis in a fresh interpreter: memory freed by an earlier analysis stays
+# resident, so later peaks measured in the same process would read too low. A small
+# noisy image of each format is analysed first, so the decoders and the buffers the
+# clustering libraries allocate once per process are not counted.
+_MEASURE_RSS = """
+import gc, io, json, sys
+import numpy as np
+from PIL import Image
+from benchmark.memory import current_rss, peak_rss, reset_peak_rss
+from module.ui_rules.color import ColorModule
+from module.validation import ImageValidationError
+
+options = json.loads(sys.argv[1])
+image_byte = sys.stdin.buffer.read()
+noise = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+for format in ("PNG", "JPEG"):
+    warm_up = io.BytesIO()
+    Image.fromarray(noise).save(warm_up, format)
+    ColorModule(warm_up.getvalue(), seed=0, **options).extract_dominant_colors()
+gc.collect()
+reset_peak_rss()
+before = current_rss()
+try:
+    module = ColorModule(image_byte, seed=0, **options)
+    module.extract_dominant_colors()
+    pixels = module.image.shape[0] * module.image.shape[1]
+except ImageValidationError:
+    pixels = None
+print(json.dumps({"rss": peak_rss() - before, "pixels": pixels}))
+"""
+
+
+@pytest.fixture(scope="module", autouse=True)
+def import_engines():
+    # scikit-learn allocates a lot while it is imported; keep that out of the peaks
+    import sklearn.cluster  # noqa: F401
+
+
+def _peak(image_byte, **options):
+    """
+    :return: A tuple (peak bytes allocated while decoding and analysing, decoded pixels).
+    """
+    tracemalloc.start()
+    try:
+        module = ColorModule(image_byte, seed=0, **options)
+        module.extract_dominant_colors()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, module.image.shape[0] * module.image.shape[1]
+
+
+def _peak_rss(image_byte, **options):
+    """
+    Unlike tracemalloc, the resident set size includes what Pillow allocates to decode.
+    :return: A tuple (peak RSS growth in bytes, decoded pixels or None if refused).
+    """
+    if not reset_peak_rss():
+        pytest.skip("peak RSS cannot be reset on this platform")
+    process = subprocess.run(
+        [sys.executable, "-c", _MEASURE_RSS, json.dumps(options)],
+        input=image_byte,
+        capture_output=True,
+        cwd=BACKEND,
+        check=True,
+    )
+    measured = json.loads(process.stdout)
+    return measured["rss"], measured["pixels"]
+
+
+@pytest.fixture(scope="module", params=IMAGES, ids=os.path.basename)
+def image_byte(request):
+    with open(request.param, "rb") as f:
+        return f.read()
+
+
+OPTIONS = pytest.mark.parametrize(
+    "options", [{}, {"incremental": True}], ids=["weighted", "incremental"]
+)
+
+
+@OPTIONS
+def test_peak_bytes_per_pixel(image_byte, options):
+    peak, pixels = _peak(image_byte, **options)
+    assert peak / pixels <= PEAK_BYTES_PER_PIXEL
+
+
+@OPTIONS
+def test_memory_budget_bounds_the_peak(image_byte, options):
+    # A PNG is decoded in full before it is reduced, so the budget must hold its raster
+    decode_bytes = ImageHandler(image_byte).validate().decode_bytes
+    budget = decode_bytes + 4 * 1024**2
+    peak, pixels = _peak(image_byte, memory_budget=budget, **options)
+    assert pixels <= (budget - decode_bytes) // PEAK_BYTES_PER_PIXEL
+    assert peak <= budget
+    rss, pixels = _peak_rss(image_byte, memory_budget=budget, **options)
+    assert pixels <= (budget - decode_bytes) // PEAK_BYTES_PER_PIXEL
+    assert rss <= budget
+
+
+def test_jpeg_is_decoded_within_the_budget(image_byte):
+    output = io.BytesIO()
+    Image.open(io.BytesIO(image_byte)).convert("RGB").save(output, "JPEG")
+    budget = 4 * 1024**2
+    rss, pixels = _peak_rss(output.getvalue(), memory_budget=budget)
+    assert pixels <= budget // PEAK_BYTES_PER_PIXEL
+    assert rss <= budget
+
+
+def test_png_too_large_to_decode_is_refused_before_decoding(image_byte):
+    budget = 4 * 1024**2
+    assert ImageHandler(image_byte).validate().decode_bytes > budget
+    with pytest.raises(ImageValidationError) as error:
+        ColorModule(image_byte, memory_budget=budget)
+    assert error.value.status_code == 413
+    rss, pixels = _peak_rss(image_byte, memory_budget=budget)
+    assert pixels is None and rss <= budget
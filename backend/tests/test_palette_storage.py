@@ -0,0 +1,63 @@
+import logging
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+import app
+from module.palettes import PaletteStore
+
+IMAGE = os.path.join(os.path.dirname(__file__), "..", "..", "image", "40-40-20-blank.png")
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app.app) as client:
+        yield client
+
+
+def _upload(client, **params):
+    with open(IMAGE, "rb") as f:
+        response = client.post("/603010", params=params, files={"image": ("a.png", f)})
+    assert response.status_code == 200
+    return response.headers["X-Analysis-Id"]
+
+
+def test_palettes_are_stored_in_the_background(client):
+    key = _upload(client)
+    deadline = time.monotonic() + 5
+    while app.palette_store.get(key) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert app.palette_store.get(key) is not None
+
+
+def test_palette_store_failures_do_not_fail_the_analysis(client, monkeypatch, caplog):
+    def broken(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(app.palette_store, "add", broken)
+    with caplog.at_level(logging.ERROR, logger="app"):
+        key = _upload(client, acceptable_range=7)
+        deadline = time.monotonic() + 5
+        while not caplog.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert key in caplog.records[0].getMessage()
+
+
+def test_searches_find_palettes_stored_by_other_workers(client):
+    key = _upload(client, acceptable_range=9)
+    deadline = time.monotonic() + 5
+    while app.palette_store.get(key) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    result = app.palette_store.get(key)["result"]
+    color = "#%02x%02x%02x" % tuple(result["primary_color"]["color"])
+    count = client.get("/palettes/primary", params={"color": color}).json()["count"]
+
+    # Another server process writes to the same database
+    other = PaletteStore(app.settings.palette_db)
+    try:
+        other.add("from-another-worker", "hash", result)
+    finally:
+        other.close()
+    response = client.get("/palettes/primary", params={"color": color}).json()
+    assert response["count"] == count + 1
+    assert "from-another-worker" in [record["id"] for record in response["results"]]
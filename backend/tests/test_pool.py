@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from module.worker import AnalysisPool
+
+
+class _Executor(Executor):
+    def __init__(self):
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        self.futures.append(Future())
+        return self.futures[-1]
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_late_failure_does_not_shut_down_the_replacement_pool():
+    async def main():
+        pool = AnalysisPool(max_workers=1, max_pending=4)
+        old = pool._executor = _Executor()
+        first = asyncio.create_task(pool.run(print))
+        second = asyncio.create_task(pool.run(print))
+        await asyncio.sleep(0)
+
+        old.futures[0].set_exception(BrokenProcessPool())
+        with pytest.raises(BrokenProcessPool):
+            await first
+        assert old.shut_down and pool._executor is None
+
+        # A new request started a replacement pool before the second job reported
+        new = pool._executor = _Executor()
+        old.futures[1].set_exception(BrokenProcessPool())
+        with pytest.raises(BrokenProcessPool):
+            await second
+        assert pool._executor is new and not new.shut_down
+
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+import os
+from module.cache import ResultCache
+
+
+def _files(directory):
+    return sorted(name for _, _, names in os.walk(directory) for name in names)
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    value = {"padding": "x" * 100}
+    cache = ResultCache(max_entries=0, directory=str(tmp_path), max_disk_bytes=350)
+    for key in ("aa1", "bb2", "cc3"):
+        cache.put(key, value)
+    assert cache.get("aa1") == value  # aa1 is now the most recently used
+
+    cache.put("dd4", value)
+    assert _files(tmp_path) == ["aa1.json", "cc3.json", "dd4.json"]
+    assert cache.stats()["disk_bytes"] <= 350
+
+
+def test_disk_tier_limit_applies_to_files_of_earlier_runs(tmp_path):
+    cache = ResultCache(max_entries=0, directory=str(tmp_path))
+    for key in ("aa1", "bb2", "cc3"):
+        cache.put(key, {"padding": "x" * 100})
+
+    reopened = ResultCache(max_entries=0, directory=str(tmp_path), max_disk_bytes=250)
+    assert reopened.stats()["disk_entries"] == 2
+    assert len(_files(tmp_path)) == 2
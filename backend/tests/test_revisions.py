@@ -0,0 +1,37 @@
+import io
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+import app
+
+
+def _png(accent_width):
+    image = Image.new("RGB", (400, 300), (30, 60, 200))
+    image.paste((220, 220, 40), (240, 0, 400, 300))
+    image.paste((200, 30, 30), (0, 0, accent_width, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app.app) as client:
+        yield client
+
+
+def _upload(client, image_byte, **params):
+    response = client.post("/603010", params=params, files={"image": ("a.png", image_byte)})
+    assert response.status_code == 200
+    return response.headers["X-Analysis-Id"]
+
+
+def test_state_is_kept_only_for_revisable_analyses(client):
+    key = _upload(client, _png(100))
+    assert app.analysis_states.get(key) is None
+
+    key = _upload(client, _png(120), revisable="true")
+    assert app.analysis_states.get(key) is not None
+
+    revision = _upload(client, _png(140), previous=key)
+    assert app.analysis_states.get(revision) is not None
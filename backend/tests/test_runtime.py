@@ -0,0 +1,19 @@
+import os
+import pytest
+from machine_learning import runtime
+
+
+def test_exports_older_than_the_weights_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime, "MODEL_DIR", str(tmp_path))
+    weights = runtime.artifact_path("model", "eager")
+    script = runtime.artifact_path("model", "torchscript")
+    for path, mtime in ((script, 1_000), (weights, 2_000)):
+        open(path, "wb").close()
+        os.utime(path, (mtime, mtime))
+
+    assert not runtime._available("torchscript", script, weights)
+    with pytest.raises(FileNotFoundError):
+        runtime.load_runtime("model", "torchscript")
+
+    os.utime(script, (3_000, 3_000))
+    assert runtime._available("torchscript", script, weights)
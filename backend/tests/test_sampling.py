@@ -0,0 +1,34 @@
+import glob
+import os
+import numpy as np
+import pytest
+from module.ui_rules.color import ColorModule
+
+IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "..", "image", "*.png")))
+
+
+def _percentages(dominant_colors):
+    counts = np.array([count for _, count in dominant_colors], dtype=np.float64)
+    return np.sort(counts / counts.sum() * 100)
+
+
+@pytest.fixture(scope="module", params=IMAGES, ids=os.path.basename)
+def image(request):
+    with open(request.param, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("engine", ["kmeans", "histogram"])
+def test_sampled_percentages_within_error_bound(image, engine):
+    full = _percentages(ColorModule(image, engine=engine, seed=0).extract_dominant_colors())
+    for strategy in ("uniform", "stratified"):
+        module = ColorModule(image, sample=strategy, engine=engine, seed=0)
+        sampled = _percentages(module.extract_dominant_colors())
+        assert 0 < module.error_bound < 1
+        assert np.abs(sampled - full).max() <= module.error_bound
+
+
+def test_no_error_bound_without_sampling(image):
+    module = ColorModule(image, sample="uniform", sample_size=10**9, seed=0)
+    module.extract_dominant_colors()
+    assert module.error_bound == 0.0
@@ -0,0 +1,55 @@
+import glob
+import io
+import os
+import numpy as np
+import pytest
+from PIL import Image
+from module.ui_rules.color import ColorModule
+from module.ui_rules.incremental import tile_slices
+from module.ui_rules.unique_colors import merge_color_counts
+
+IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "..", "image", "*.png")))
+
+
+def _noise_image():
+    # Many distinct colors, so that tiles share some colors and not others
+    pixels = np.random.default_rng(0).integers(0, 32, size=(300, 200, 3), dtype=np.uint8) * 8
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _name(path):
+    return os.path.basename(path) if path else "noise"
+
+
+@pytest.fixture(scope="module", params=[*IMAGES, None], ids=_name)
+def image_byte(request):
+    return _read(request.param) if request.param else _noise_image()
+
+
+def test_tile_counts_equal_whole_image_counts(image_byte):
+    module = ColorModule(image_byte, tile_workers=4, tile_min_pixels=0)
+    image = module.image
+    colors, counts = module._filter_pixels(image, module._remove_background(image))
+
+    assert module._use_tiles(image)
+    tile_colors, tile_counts = module._filter_tiles(image)
+    np.testing.assert_array_equal(tile_colors, colors)
+    np.testing.assert_array_equal(tile_counts, counts)
+
+    tiles = tile_slices(image.shape[0], image.shape[1], 128)
+    tile_colors, tile_counts = merge_color_counts(module._count_tiles(image, tiles))
+    np.testing.assert_array_equal(tile_colors, colors)
+    np.testing.assert_array_equal(tile_counts, counts)
+
+
+def test_tiled_analysis_equals_single_block(image_byte):
+    single = ColorModule(image_byte, seed=0).extract_dominant_colors()
+    tiled = ColorModule(image_byte, seed=0, tile_workers=4, tile_min_pixels=0)
+    assert tiled.extract_dominant_colors() == single
@@ -0,0 +1,9 @@
+from module.metrics.timing import NULL_TIMER
+
+
+def test_null_timer_stages_do_not_share_info():
+    with NULL_TIMER.stage("decode") as info:
+        info["pixels"] = 100
+    with NULL_TIMER.stage("filter") as info:
+        assert info == {}
+    assert NULL_TIMER.to_list() == []
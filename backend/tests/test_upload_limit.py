@@ -0,0 +1,40 @@
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from module.http import UploadLimitMiddleware
+
+calls = []
+limited = FastAPI()
+limited.add_middleware(UploadLimitMiddleware, max_body_bytes=1000, path_limits={"/big": 10_000})
+
+
+@limited.post("/upload")
+@limited.post("/big")
+async def upload(image: UploadFile):
+    calls.append(len(await image.read()))
+    return {}
+
+
+def test_large_bodies_are_rejected_before_the_form_is_parsed():
+    client = TestClient(limited)
+    calls.clear()
+    assert client.post("/upload", files={"image": ("a", b"x" * 500)}).status_code == 200
+    assert client.post("/upload", files={"image": ("a", b"x" * 5000)}).status_code == 413
+    assert client.post("/big", files={"image": ("a", b"x" * 5000)}).status_code == 200
+    assert calls == [500, 5000]
+
+
+def test_bodies_without_content_length_are_cut_off():
+    client = TestClient(limited)
+    calls.clear()
+
+    def chunks():
+        for _ in range(100):
+            yield b"x" * 100
+
+    response = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413 and response.json()["detail"] == "Upload is too large."
+    assert calls == []